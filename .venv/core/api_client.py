@@ -0,0 +1,251 @@
+# Gestione delle richieste API
+import codecs
+import json
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.metrics import get_metrics
+from data.onepiece.state_manager import get_token
+
+API_BASE_URL = "https://api.cardtrader.com/api/v2"
+
+# Limiti CardTrader: /marketplace/products accetta 10 richieste al secondo,
+# il resto dell'API 200 richieste ogni 10 secondi
+MARKETPLACE_RATE = 10
+MARKETPLACE_BURST = 10
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def endpoint_name(path, params=None):
+    """Etichetta dell'endpoint per le metriche: /marketplace/products per blueprint e per espansione sono ben diversi"""
+    path = "/" + path.lstrip("/")
+    return f"{path}?{next(iter(params))}" if params else path
+
+
+def iter_marketplace_groups(chunks):
+    """Legge in streaming un oggetto JSON {blueprint_id: [offerte]} da blocchi di byte.
+
+    Restituisce una coppia (blueprint_id, offerte) alla volta senza caricare l'intera
+    risposta in memoria; funziona sia su una response HTTP sia su un file registrato.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+    finished = False
+    expect_key = True
+    key = None
+
+    for chunk in chunks:
+        buffer = buffer[pos:] + utf8.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if not started:
+                if char != "{":
+                    raise ValueError("Risposta marketplace non valida: atteso un oggetto JSON")
+                started = True
+                pos += 1
+            elif char in ",:":
+                pos += 1
+            elif char == "}" and expect_key:
+                finished = True
+                return
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    break  # Valore incompleto, servono altri byte
+                pos = end
+                if expect_key:
+                    key = value
+                else:
+                    yield key, value
+                expect_key = not expect_key
+
+    # Solo la graffa di chiusura garantisce che la risposta sia completa
+    if not finished:
+        raise ValueError("Risposta marketplace troncata")
+
+
+class RateLimiter:
+    """Token bucket thread-safe: `rate` gettoni al secondo, al massimo `burst` accumulati"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CardTraderClient:
+    """Client HTTP condiviso: una sola Session keep-alive, token letto una volta, retry con backoff"""
+
+    def __init__(self, token, base_url=API_BASE_URL, rate=MARKETPLACE_RATE, burst=MARKETPLACE_BURST,
+                 pool_size=8, max_retries=4, backoff=0.5):
+        self.base_url = base_url.rstrip("/")
+        self.limiter = RateLimiter(rate, burst)
+        self.metrics = get_metrics()
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {token}"})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _retry_delay(self, attempt, response=None):
+        """Attesa prima del prossimo tentativo: Retry-After se presente, altrimenti backoff esponenziale con jitter"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    pass
+        return self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+
+    def _request(self, path, params=None, timeout=15, stream=False):
+        """Esegue una GET rispettando il rate limit e ritentando su 429/5xx; ritorna la response o None"""
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        endpoint = endpoint_name(path, params)
+        metrics = self.metrics
+        for attempt in range(self.max_retries + 1):
+            with metrics.timer("attesa_rate_limit"):
+                self.limiter.acquire()
+            if attempt:
+                metrics.incr("api.retry")
+            metrics.incr("api.richieste")
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    metrics.incr("api.errori")
+                    print(f"❌ Errore API {path}: {str(e)}")
+                    return None
+                time.sleep(self._retry_delay(attempt))
+                continue
+            # Con stream=True è il tempo fino alle intestazioni, il corpo viene letto dopo
+            metrics.observe_latency(endpoint, time.perf_counter() - start)
+            if response.status_code == 429:
+                metrics.incr("api.429")
+
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                response.close()
+                time.sleep(self._retry_delay(attempt, response))
+                continue
+
+            try:
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                metrics.incr("api.errori")
+                print(f"❌ Errore API {path}: {str(e)}")
+                response.close()
+                return None
+            return response
+        return None
+
+    def get(self, path, params=None, timeout=15):
+        """Esegue una GET e ritorna il JSON decodificato o None in caso di errore"""
+        response = self._request(path, params, timeout)
+        if response is None:
+            return None
+        try:
+            with self.metrics.timer("parsing_json"):
+                return response.json()
+        except ValueError as e:
+            print(f"❌ Risposta non valida da {path}: {str(e)}")
+            return None
+
+    def get_raw(self, path, params=None, timeout=15):
+        """Come get, ma ritorna il corpo della risposta in byte senza decodificarlo"""
+        response = self._request(path, params, timeout)
+        return response.content if response is not None else None
+
+    def fetch_marketplace_products(self, blueprint_id):
+        """Recupera le offerte Near Mint di un blueprint ordinate per prezzo"""
+        return self.get(
+            "/marketplace/products",
+            params={
+                'blueprint_id': blueprint_id,
+                'properties[condition]': 'Near Mint',
+                'per_page': 100,
+                'sort_by': 'price_asc'
+            }
+        )
+
+    def stream_expansion_products(self, expansion_id):
+        """Scarica le offerte di un'intera espansione e restituisce (blueprint_id, offerte) man mano che vengono lette.
+
+        Solleva RequestException se la richiesta fallisce, così non si confonde con un'espansione senza offerte.
+        """
+        response = self._request(
+            "/marketplace/products",
+            params={'expansion_id': expansion_id},
+            timeout=60,
+            stream=True
+        )
+        if response is None:
+            raise requests.exceptions.RequestException(f"Richiesta offerte espansione {expansion_id} fallita")
+        try:
+            yield from iter_marketplace_groups(self._timed_chunks(response.iter_content(chunk_size=65536)))
+        finally:
+            response.close()
+
+    def _timed_chunks(self, chunks):
+        """Inoltra i blocchi della response misurando solo il tempo di lettura dalla rete"""
+        elapsed = 0.0
+        chunks = iter(chunks)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield chunk
+        finally:
+            self.metrics.add_time("download_espansione", elapsed)
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    """Restituisce il client condiviso, creato alla prima chiamata"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = CardTraderClient(get_token())
+        return _default_client
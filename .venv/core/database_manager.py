@@ -0,0 +1,248 @@
+# Gestione dei database locali
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from core.metrics import get_metrics
+
+DB_FILE = Path(__file__).resolve().parent.parent / "data" / "prices" / "snapshots.db"
+
+PRICE_TTL = 15 * 60  # Secondi di validità di uno snapshot prima di riscaricarlo
+MAX_OFFERS_PER_KEY = 10  # Offerte più economiche conservate per ogni chiave
+HISTORY_DAYS = 90  # Giorni di storico prezzi conservati per blueprint e lingua
+BATCH_SIZE = 50  # Blueprint accumulati prima di scrivere su disco
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blueprints (
+    blueprint_id INTEGER PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    blueprint_id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    zero INTEGER NOT NULL,
+    offers_count INTEGER NOT NULL,
+    min_price_cents INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (blueprint_id, language, condition, zero)
+);
+CREATE TABLE IF NOT EXISTS offers (
+    blueprint_id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    zero INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    price_cents INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS offers_blueprint ON offers (blueprint_id);
+CREATE TABLE IF NOT EXISTS history (
+    blueprint_id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    day TEXT NOT NULL,
+    min_price_cents INTEGER NOT NULL,
+    PRIMARY KEY (blueprint_id, language, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS history_day ON history (day);
+"""
+
+
+def group_offers(products):
+    """Raggruppa le offerte per (lingua, condizione, Zero) tenendo le più economiche di ogni gruppo"""
+    groups = {}
+    for product in products:
+        props = product.get('properties_hash', {})
+        key = (
+            props.get('onepiece_language', '').lower(),
+            props.get('condition', ''),
+            1 if product['user']['can_sell_via_hub'] else 0
+        )
+        groups.setdefault(key, []).append((product['price_cents'], product['id']))
+    for key, offers in groups.items():
+        offers.sort()
+        del offers[MAX_OFFERS_PER_KEY:]
+    return groups
+
+
+class PriceStore:
+    """Archivio SQLite degli snapshot del marketplace, condivisibile tra thread di scansione e GUI"""
+
+    def __init__(self, db_file=DB_FILE, ttl=PRICE_TTL, batch_size=BATCH_SIZE):
+        self.db_file = Path(db_file)
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.local = threading.local()
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.pruned_on = None  # Giorno dell'ultima pulizia dello storico
+
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def connection(self):
+        """Una connessione per thread: SQLite in WAL permette letture concorrenti a una scrittura"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def fresh_blueprints(self, blueprint_ids, now=None):
+        """Restituisce l'insieme dei blueprint con uno snapshot ancora valido"""
+        now = now or time.time()
+        ids = [int(bp_id) for bp_id in blueprint_ids]
+        fresh = set()
+        conn = self.connection()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT blueprint_id FROM blueprints WHERE expires_at > ? AND blueprint_id IN ({placeholders})",
+                [now, *chunk]
+            )
+            fresh.update(row[0] for row in rows)
+        return fresh
+
+    def load_prices(self, blueprint_id):
+        """Ricostruisce i dati del blueprint nel formato della risposta di /marketplace/products"""
+        rows = self.connection().execute(
+            "SELECT language, condition, zero, product_id, price_cents FROM offers "
+            "WHERE blueprint_id = ? ORDER BY price_cents",
+            (int(blueprint_id),)
+        )
+        products = [
+            {
+                'id': product_id,
+                'blueprint_id': int(blueprint_id),
+                'price_cents': price_cents,
+                'properties_hash': {'onepiece_language': language, 'condition': condition},
+                'user': {'can_sell_via_hub': bool(zero)}
+            }
+            for language, condition, zero, product_id, price_cents in rows
+        ]
+        return {str(blueprint_id): products}
+
+    def load_columns(self, blueprint_ids, selected_languages, only_zero=False):
+        """Offerte Near Mint dei blueprint in colonne, già filtrate in SQL, per analyze_columns"""
+        languages = [l.lower() for l in selected_languages]
+        ids = [int(bp_id) for bp_id in blueprint_ids]
+        columns = ([], [], [], [], [], [])
+        conn = self.connection()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = conn.execute(
+                "SELECT blueprint_id, language, condition, zero, price_cents, product_id FROM offers "
+                f"WHERE blueprint_id IN ({','.join('?' * len(chunk))}) "
+                f"AND language IN ({','.join('?' * len(languages))}) "
+                "AND condition = 'Near Mint' AND zero >= ? ORDER BY blueprint_id, price_cents",
+                [*chunk, *languages, 1 if only_zero else 0]
+            ).fetchall()
+            for column, values in zip(columns, zip(*rows)):
+                column.extend(values)
+        return columns
+
+    def add(self, blueprint_id, prices_data):
+        """Accoda uno snapshot; viene scritto su disco ogni `batch_size` blueprint"""
+        products = (prices_data or {}).get(str(blueprint_id), [])
+        with self.pending_lock:
+            self.pending.append((int(blueprint_id), group_offers(products), time.time()))
+            if len(self.pending) < self.batch_size:
+                return
+            batch, self.pending = self.pending, []
+        with get_metrics().timer("scrittura_archivio"):
+            self.write(batch)
+
+    def flush(self):
+        with self.pending_lock:
+            batch, self.pending = self.pending, []
+        if batch:
+            with get_metrics().timer("scrittura_archivio"):
+                self.write(batch)
+        self.prune_history()
+
+    def write(self, batch):
+        conn = self.connection()
+        with conn:
+            for blueprint_id, groups, fetched_at in batch:
+                expires_at = fetched_at + self.ttl
+                day = datetime.fromtimestamp(fetched_at).strftime("%Y-%m-%d")
+                conn.execute("DELETE FROM snapshots WHERE blueprint_id = ?", (blueprint_id,))
+                conn.execute("DELETE FROM offers WHERE blueprint_id = ?", (blueprint_id,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO blueprints VALUES (?, ?, ?)",
+                    (blueprint_id, fetched_at, expires_at)
+                )
+                conn.executemany(
+                    "INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (blueprint_id, language, condition, zero, len(offers), offers[0][0], fetched_at, expires_at)
+                        for (language, condition, zero), offers in groups.items()
+                    ]
+                )
+                conn.executemany(
+                    "INSERT INTO offers VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (blueprint_id, language, condition, zero, product_id, price_cents)
+                        for (language, condition, zero), offers in groups.items()
+                        for price_cents, product_id in offers
+                    ]
+                )
+
+                # Storico: un solo minimo giornaliero per lingua
+                minimums = {}
+                for (language, condition, zero), offers in groups.items():
+                    minimums[language] = min(minimums.get(language, offers[0][0]), offers[0][0])
+                conn.executemany(
+                    "INSERT INTO history VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (blueprint_id, language, day) "
+                    "DO UPDATE SET min_price_cents = MIN(min_price_cents, excluded.min_price_cents)",
+                    [(blueprint_id, language, day, price) for language, price in minimums.items()]
+                )
+
+    def prune_history(self, today=None):
+        """Elimina lo storico più vecchio di HISTORY_DAYS; viene eseguita al massimo una volta al giorno"""
+        today = today or date.today()
+        if self.pruned_on == today:
+            return
+        self.pruned_on = today
+        cutoff = (today - timedelta(days=HISTORY_DAYS)).strftime("%Y-%m-%d")
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM history WHERE day < ?", (cutoff,))
+
+    def price_history(self, blueprint_id, language, days=30):
+        """Prezzi minimi giornalieri (giorno, euro) degli ultimi `days` giorni"""
+        since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        rows = self.connection().execute(
+            "SELECT day, min_price_cents FROM history "
+            "WHERE blueprint_id = ? AND language = ? AND day >= ? ORDER BY day",
+            (int(blueprint_id), language.lower(), since)
+        )
+        return [(day, price_cents / 100) for day, price_cents in rows]
+
+    def close(self):
+        self.flush()
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_store():
+    """Restituisce l'archivio prezzi condiviso, creato alla prima chiamata"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = PriceStore()
+        return _default_store
@@ -0,0 +1,28 @@
+# Scritture su file
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def atomic_write(path, mode="w", encoding="utf-8"):
+    """Apre un file temporaneo nella stessa cartella e alla fine lo rinomina su `path`.
+
+    Chi legge vede sempre il file vecchio o quello nuovo, mai uno scritto a metà;
+    se il blocco fallisce il file temporaneo viene eliminato e `path` resta invariato.
+    """
+    path = Path(path)
+    fd, tmp_file = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with open(fd, mode, encoding=None if "b" in mode else encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    except BaseException:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,235 @@
+# core/metrics.py
+"""Metriche leggere dei punti caldi: contatori, tempi per fase e latenze API per endpoint.
+
+Tutto è cumulativo dall'avvio; per il riepilogo di una singola scansione si prende
+uno `snapshot()` all'inizio e si passa a `summary(since=...)` alla fine.
+"""
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Limiti superiori (ms) dei bucket dell'istogramma delle latenze; l'ultimo raccoglie il resto
+LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+LOG_INTERVAL = 30  # Secondi tra due righe di log strutturato
+
+
+def subtract(current, previous):
+    """Differenza tra due snapshot (dizionari annidati di numeri o liste di numeri)"""
+    if isinstance(current, dict):
+        return {key: subtract(value, previous.get(key)) if previous else value for key, value in current.items()}
+    if isinstance(current, list):
+        return [a - b for a, b in zip(current, previous)] if previous else current
+    return current - (previous or 0)
+
+
+def percentile(buckets, fraction):
+    """Limite superiore (ms) del bucket che contiene il percentile richiesto; None se oltre l'ultimo"""
+    total = sum(buckets)
+    if not total:
+        return 0
+    seen = 0
+    for limit, count in zip(LATENCY_BUCKETS_MS + [None], buckets):
+        seen += count
+        if seen >= total * fraction:
+            return limit
+    return None
+
+
+class Metrics:
+    """Raccolta thread-safe di contatori, tempi per fase e istogrammi di latenza per endpoint.
+
+    I tempi delle fasi eseguite nei worker sono sommati su tutti i thread e possono
+    superare la durata reale della scansione.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.timers = {}  # fase -> {"count", "total"}
+            self.latency = {}  # endpoint -> {"count", "total", "buckets"}
+            self.started = time.perf_counter()
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_time(self, phase, seconds):
+        with self.lock:
+            timer = self.timers.setdefault(phase, {"count": 0, "total": 0.0})
+            timer["count"] += 1
+            timer["total"] += seconds
+
+    @contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def observe_latency(self, endpoint, seconds):
+        milliseconds = seconds * 1000
+        index = len(LATENCY_BUCKETS_MS)
+        for i, limit in enumerate(LATENCY_BUCKETS_MS):
+            if milliseconds <= limit:
+                index = i
+                break
+        with self.lock:
+            histogram = self.latency.setdefault(
+                endpoint, {"count": 0, "total": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+            )
+            histogram["count"] += 1
+            histogram["total"] += seconds
+            histogram["buckets"][index] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "elapsed": time.perf_counter() - self.started,
+                "counters": dict(self.counters),
+                "timers": {phase: dict(timer) for phase, timer in self.timers.items()},
+                "latency": {
+                    endpoint: {**histogram, "buckets": list(histogram["buckets"])}
+                    for endpoint, histogram in self.latency.items()
+                }
+            }
+
+    def report(self, since=None):
+        """Metriche (dall'istante di `since`, se indicato) con i valori derivati già calcolati"""
+        data = self.snapshot()
+        if since:
+            data = subtract(data, since)
+        counters = data["counters"]
+        elapsed = data["elapsed"]
+
+        cards = counters.get("carte.analizzate", 0)
+        data["cards_per_second"] = round(cards / elapsed, 2) if elapsed else 0
+        data["cache_hit_ratio"] = {}
+        for name in counters:
+            if name.startswith("cache.") and name.endswith(".hit"):
+                cache = name[len("cache."):-len(".hit")]
+                hits = counters[name]
+                total = hits + counters.get(f"cache.{cache}.miss", 0)
+                data["cache_hit_ratio"][cache] = round(hits / total, 3) if total else 0
+        for histogram in data["latency"].values():
+            histogram["mean_ms"] = round(histogram["total"] / histogram["count"] * 1000, 1) if histogram["count"] else 0
+            histogram["p50_ms"] = percentile(histogram["buckets"], 0.5)
+            histogram["p95_ms"] = percentile(histogram["buckets"], 0.95)
+        return data
+
+    def summary(self, since=None, title="Metriche"):
+        """Riepilogo leggibile da stampare alla fine di una scansione"""
+        data = self.report(since)
+        counters = data["counters"]
+        lines = [f"📊 {title} ({data['elapsed']:.1f}s)"]
+
+        if "carte.analizzate" in counters:
+            lines.append(f"• Carte analizzate: {counters['carte.analizzate']} → {data['cards_per_second']:.1f} carte/s")
+        for cache, ratio in sorted(data["cache_hit_ratio"].items()):
+            hits = counters.get(f"cache.{cache}.hit", 0)
+            total = hits + counters.get(f"cache.{cache}.miss", 0)
+            lines.append(f"• Cache {cache}: {hits}/{total} ({ratio:.0%})")
+        if "api.richieste" in counters:
+            lines.append(
+                f"• API: {counters['api.richieste']} richieste, {counters.get('api.retry', 0)} retry, "
+                f"{counters.get('api.429', 0)} risposte 429, {counters.get('api.errori', 0)} errori"
+            )
+        for endpoint, histogram in sorted(data["latency"].items()):
+            if not histogram["count"]:
+                continue
+            p95 = f"≤{histogram['p95_ms']} ms" if histogram["p95_ms"] is not None else f">{LATENCY_BUCKETS_MS[-1]} ms"
+            lines.append(
+                f"  - {endpoint}: {histogram['count']}× media {histogram['mean_ms']:.0f} ms, "
+                f"p50 ≤{histogram['p50_ms']} ms, p95 {p95}"
+            )
+        phases = sorted(data["timers"].items(), key=lambda item: item[1]["total"], reverse=True)
+        for phase, timer in phases:
+            if timer["count"]:
+                lines.append(f"• {phase}: {timer['total']:.2f}s in {timer['count']} chiamate")
+        return "\n".join(lines)
+
+    def log_record(self, since=None):
+        """Una riga JSON con le metriche, per i log periodici"""
+        return json.dumps({
+            "type": "metrics",
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **self.report(since)
+        }, ensure_ascii=False)
+
+
+class MetricsReporter:
+    """Thread che scrive le metriche come riga JSON ogni `interval` secondi (e una volta alla chiusura)"""
+
+    def __init__(self, metrics, interval=LOG_INTERVAL, stream=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="metrics-reporter", daemon=True)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.write()
+
+    def write(self):
+        self.stream.write(self.metrics.log_record() + "\n")
+        self.stream.flush()
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.write()
+
+
+@contextmanager
+def profiled(profile_file=None, memory=False, top=20):
+    """Profila il blocco con cProfile (e facoltativamente tracemalloc) e stampa le funzioni più costose.
+
+    Pensato per una singola esecuzione: con `profile_file` salva anche le statistiche
+    complete, da aprire con snakeviz o `python -m pstats`.
+    """
+    profiler = cProfile.Profile()
+    if memory:
+        tracemalloc.start()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output).sort_stats("cumulative")
+        stats.print_stats(top)
+        print(f"🔬 Profilo cProfile (prime {top} funzioni per tempo cumulativo):\n{output.getvalue()}")
+        if profile_file:
+            stats.dump_stats(str(profile_file))
+            print(f"💾 Profilo salvato in {profile_file}")
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"🧠 Memoria: {current / 1024 / 1024:.1f} MB in uso, picco {peak / 1024 / 1024:.1f} MB")
+            for stat in snapshot.statistics("lineno")[:10]:
+                print(f"  - {stat}")
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """Restituisce le metriche condivise dal processo"""
+    return _metrics
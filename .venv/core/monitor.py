@@ -0,0 +1,412 @@
+# core/monitor.py
+"""Monitor senza interfaccia: riscansiona di continuo le carte selezionate e segnala le opportunità.
+
+Uso: python -m core.monitor [--webhook URL | --output file.jsonl] [--budget 300] ...
+Espansioni, lingue e rarità di default sono quelle salvate dall'interfaccia
+(saved_state.json ed excluded_expansions.json).
+"""
+import argparse
+import contextlib
+import heapq
+import itertools
+import json
+import random
+import signal
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from core.api_client import API_BASE_URL, CardTraderClient
+from core.database_manager import get_store
+from core.metrics import MetricsReporter, get_metrics
+from core.onepiece_search_logic import SCAN_WORKERS, BULK_MIN_CARDS, RANK_DEPTH, is_opportunity, scan_card_prices
+from core.price_analyzer import analyze_card_prices, language_name
+from data.onepiece.catalog_index import get_catalog
+from data.onepiece.expansion_manager import load_excluded_expansions
+from data.onepiece.state_manager import get_token, load_state
+
+REQUEST_BUDGET = 300  # Richieste al minuto concesse al monitor (CardTrader ne consente 600)
+BASE_INTERVAL = 10 * 60  # Secondi tra due scansioni di una carta senza nulla di particolare
+MIN_INTERVAL = 60
+MAX_INTERVAL = 6 * 60 * 60
+DEAD_FACTOR = 6  # Carte senza almeno due offerte nelle lingue scelte: controllate 6 volte più di rado
+HIGH_VALUE = 50  # Euro: sopra questo prezzo la carta viene controllata più spesso
+NEAR_THRESHOLD_PCT = 15  # Convenienza (%) da cui una carta è considerata vicina alla soglia
+VOLATILITY_PCT = 10  # Variazione (%) del prezzo più basso tra due scansioni che rende una carta volatile
+JITTER = 0.1  # Sfasamento casuale degli intervalli, per non far scadere le carte tutte insieme
+STATUS_INTERVAL = 60  # Secondi tra due riepiloghi di stato
+
+
+class RescanScheduler:
+    """Coda a priorità delle carte da riscansionare, ordinata per istante della prossima scansione.
+
+    L'intervallo di ogni carta si dimezza se è volatile, di valore o vicina alla soglia
+    e si allunga se non ha offerte; se la somma delle frequenze supera il budget di
+    richieste, tutti gli intervalli vengono allungati in proporzione.
+
+    Le espansioni con almeno `bulk_min_cards` carte si scaricano in blocco: quando una
+    loro carta scade si riscansiona tutta l'espansione con una sola richiesta, quindi
+    costano quanto la loro carta più frequente e non la somma delle carte.
+    """
+
+    def __init__(self, cards_by_expansion, budget_per_second, base_interval=BASE_INTERVAL,
+                 min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL, bulk_min_cards=BULK_MIN_CARDS,
+                 clock=time.monotonic):
+        self.budget = budget_per_second
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.clock = clock
+
+        self.heap = []
+        self.counter = itertools.count()
+        self.state = {}  # blueprint_id -> stato dell'ultima scansione
+        self.expansions = {}  # expansion_id -> blueprint delle carte monitorate
+        self.bulk = set()  # Espansioni scaricate in blocco
+        self.rates = {}  # expansion_id -> richieste al secondo previste
+        self.demand = 0.0  # Richieste al secondo previste con gli intervalli attuali
+
+        now = clock()
+        for exp_id, cards in cards_by_expansion.items():
+            if not cards:
+                continue
+            self.expansions[exp_id] = [card['id'] for card in cards]
+            if len(cards) >= bulk_min_cards:
+                self.bulk.add(exp_id)
+            for card in cards:
+                entry = next(self.counter)
+                self.state[card['id']] = {"card": card, "expansion_id": exp_id, "interval": base_interval,
+                                          "price": None, "entry": entry}
+                heapq.heappush(self.heap, (now, entry, card['id']))
+            self.update_rate(exp_id)
+
+    def __len__(self):
+        return len(self.state)
+
+    def update_rate(self, exp_id):
+        """Ricalcola le richieste al secondo di un'espansione e la domanda totale"""
+        intervals = [self.state[bp_id]["interval"] for bp_id in self.expansions[exp_id]]
+        if exp_id in self.bulk:
+            rate = 1 / min(intervals)
+        else:
+            rate = sum(1 / interval for interval in intervals)
+        self.demand += rate - self.rates.get(exp_id, 0.0)
+        self.rates[exp_id] = rate
+
+    def is_current(self, item):
+        """Le voci delle carte già estratte insieme alla loro espansione restano nell'heap e vanno saltate"""
+        return self.state[item[2]]["entry"] == item[1]
+
+    def next_due(self):
+        while self.heap and not self.is_current(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, limit, now=None):
+        """Estrae le carte scadute, dalla più in ritardo, raggruppate per espansione come vuole scan_card_prices.
+
+        `limit` conta le richieste: un'espansione scaricata in blocco vale una richiesta
+        e viene estratta per intero, così non la si riscarica in più lotti.
+        """
+        now = self.clock() if now is None else now
+        due = {}
+        count = 0
+        while self.heap and self.heap[0][0] <= now and count < limit:
+            item = heapq.heappop(self.heap)
+            if not self.is_current(item):
+                continue
+            exp_id = self.state[item[2]]["expansion_id"]
+            blueprint_ids = self.expansions[exp_id] if exp_id in self.bulk else [item[2]]
+            for blueprint_id in blueprint_ids:
+                state = self.state[blueprint_id]
+                state["entry"] = None
+                due.setdefault(exp_id, []).append(state["card"])
+            count += 1
+        return due
+
+    def priority_interval(self, state, prices_data, analyses):
+        """Intervallo in secondi prima della prossima scansione, in base all'esito dell'ultima"""
+        if prices_data is None:
+            # Errore di rete: si riprova senza cambiare il giudizio sulla carta
+            return state["interval"]
+        if not analyses:
+            state["price"] = None
+            return self.base_interval * DEAD_FACTOR
+
+        interval = self.base_interval
+        price = min(analysis['price1'] for analysis in analyses)
+        previous = state["price"]
+        if previous and abs(price - previous) / previous * 100 >= VOLATILITY_PCT:
+            interval /= 2
+        if max(analysis['price1'] for analysis in analyses) >= HIGH_VALUE:
+            interval /= 2
+        if max(analysis['diff_pct'] for analysis in analyses) >= NEAR_THRESHOLD_PCT:
+            interval /= 2
+        state["price"] = price
+        return interval
+
+    def reschedule(self, card, prices_data, analyses, now=None):
+        """Rimette in coda la carta appena scansionata; ritorna i secondi prima della prossima scansione"""
+        now = self.clock() if now is None else now
+        state = self.state[card['id']]
+        interval = self.priority_interval(state, prices_data, analyses)
+        interval = min(self.max_interval, max(self.min_interval, interval))
+
+        state["interval"] = interval
+        self.update_rate(state["expansion_id"])
+
+        # Più frequenze di quante il budget ne consenta: si rallenta tutto in proporzione
+        delay = interval * max(1.0, self.demand / self.budget)
+        delay *= random.uniform(1 - JITTER, 1 + JITTER)
+        state["entry"] = next(self.counter)
+        heapq.heappush(self.heap, (now + delay, state["entry"], card['id']))
+        return delay
+
+
+class JsonLinesSink:
+    """Scrive un evento JSON per riga su uno stream (di default stdout) o in append su un file"""
+
+    def __init__(self, path=None, stream=None):
+        self.owned = path is not None
+        self.stream = open(path, "a", encoding="utf-8") if path else (stream or sys.stdout)
+
+    def emit(self, event):
+        self.stream.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        if self.owned:
+            self.stream.close()
+
+
+class WebhookSink:
+    """Invia ogni evento come POST JSON a un webhook (Discord, Slack, servizio proprio...)"""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def emit(self, event):
+        try:
+            response = self.session.post(self.url, json=event, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Webhook non raggiungibile: {str(e)}")
+
+    def close(self):
+        self.session.close()
+
+
+class Monitor:
+    """Ciclo principale: estrae le carte scadute, le scarica entro il budget, analizza e segnala"""
+
+    def __init__(self, cards_by_expansion, selected_languages, min_price, max_price, min_diff, only_zero, sink,
+                 client, budget=REQUEST_BUDGET, store=None, max_workers=SCAN_WORKERS,
+                 bulk_min_cards=BULK_MIN_CARDS, base_interval=BASE_INTERVAL, min_interval=MIN_INTERVAL,
+                 max_interval=MAX_INTERVAL, clock=time.monotonic):
+        self.selected_languages = selected_languages
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_diff = min_diff
+        self.only_zero = only_zero
+        self.sink = sink
+        self.client = client
+        self.store = store
+        self.max_workers = max_workers
+        self.bulk_min_cards = bulk_min_cards
+        self.clock = clock
+        self.scheduler = RescanScheduler(
+            cards_by_expansion, budget / 60, base_interval, min_interval, max_interval, bulk_min_cards, clock=clock
+        )
+        self.stop_event = threading.Event()
+        self.metrics = get_metrics()
+
+        self.emitted = {}  # (blueprint_id, lingua) -> (product_id, price1, price2) dell'ultima segnalazione
+        self.scanned = 0
+        self.found = 0
+
+    def stop(self):
+        self.stop_event.set()
+
+    def process(self, card, prices_data):
+        analyses = []
+        if prices_data:
+            if self.store is not None:
+                self.store.add(card['id'], prices_data)
+            with self.metrics.timer("analisi"):
+                analyses = analyze_card_prices(
+                    prices_data, card['id'], self.selected_languages, self.only_zero, RANK_DEPTH
+                )
+            self.metrics.incr("carte.analizzate")
+        self.scanned += 1
+
+        hits = set()
+        for analysis in analyses:
+            if not is_opportunity(analysis, self.min_price, self.max_price, self.min_diff):
+                continue
+            key = (card['id'], analysis['language'])
+            hits.add(key)
+            signature = (analysis['product_id'], analysis['price1'], analysis['price2'])
+            # La stessa offerta allo stesso prezzo si segnala una volta sola
+            if self.emitted.get(key) == signature:
+                continue
+            self.emitted[key] = signature
+            self.found += 1
+            self.sink.emit(self.build_event(card, analysis))
+
+        # Le opportunità sparite potranno essere segnalate di nuovo se ricompaiono
+        if prices_data is not None:
+            for language in self.selected_languages:
+                key = (card['id'], language.lower())
+                if key not in hits:
+                    self.emitted.pop(key, None)
+
+        self.scheduler.reschedule(card, prices_data, analyses)
+
+    def build_event(self, card, analysis):
+        return {
+            "type": "opportunity",
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "blueprint_id": card['id'],
+            "expansion_id": self.scheduler.state[card['id']]["expansion_id"],
+            "name": card['name'],
+            "rarity": card.get('rarity', ''),
+            "language": analysis['language'],
+            "language_name": language_name(analysis['language']),
+            "price1": analysis['price1'],
+            "price2": analysis['price2'],
+            "diff_abs": analysis['diff_abs'],
+            "diff_pct": analysis['diff_pct'],
+            "price3": analysis['prices'][2] if len(analysis['prices']) > 2 else None,
+            "gaps": analysis['gaps'],
+            "product_id": analysis['product_id'],
+            "url": analysis['url'],
+            "img_url": card.get('image_url', '')
+        }
+
+    def run(self, duration=None):
+        """Scansiona finché non viene chiamato stop() o non passano `duration` secondi"""
+        start = self.clock()
+        last_status = start
+        batch_size = self.max_workers * 4
+        # Le metriche sono condivise dal processo: il riepilogo finale conta solo questa esecuzione
+        metrics_start = self.metrics.snapshot()
+        print(f"📡 Monitor avviato su {len(self.scheduler)} carte")
+        try:
+            while not self.stop_event.is_set():
+                now = self.clock()
+                if duration is not None and now - start >= duration:
+                    break
+                if now - last_status >= STATUS_INTERVAL:
+                    self.print_status()
+                    last_status = now
+
+                due = self.scheduler.pop_due(batch_size, now)
+                if not due:
+                    next_due = self.scheduler.next_due()
+                    wait = 1.0 if next_due is None else min(1.0, max(0.0, next_due - now))
+                    self.stop_event.wait(wait)
+                    continue
+
+                for card, prices_data in scan_card_prices(due, self.client, self.max_workers, self.bulk_min_cards):
+                    self.process(card, prices_data)
+                if self.store is not None:
+                    self.store.flush()
+        finally:
+            self.print_status()
+            print(self.metrics.summary(since=metrics_start, title="Metriche monitor"))
+            self.sink.close()
+
+    def print_status(self):
+        print(f"📊 Monitor: {self.scanned} scansioni, {self.found} opportunità segnalate, "
+              f"{self.scheduler.demand * 60:.0f} richieste/min previste")
+
+
+def load_selection(expansion_codes=None, languages=None, rarities=None):
+    """Espansioni, lingue e rarità da monitorare: quelle indicate, altrimenti le selezioni salvate dall'interfaccia"""
+    state = load_state()
+    catalog = get_catalog()
+    if expansion_codes:
+        codes = expansion_codes
+    else:
+        excluded = set(load_excluded_expansions())
+        codes = [exp["code"] for exp in catalog.expansions() if exp["code"] not in excluded]
+
+    expansions_ids = []
+    for code in codes:
+        exp_id = catalog.expansion_id(code)
+        if exp_id is None:
+            print(f"⚠️ Espansione {code} non trovata nel catalogo")
+            continue
+        expansions_ids.append(exp_id)
+    return expansions_ids, languages or state.get("languages", []), rarities or state.get("rarities", [])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Monitor continuo delle opportunità su CardTrader")
+    parser.add_argument("--expansions", nargs="+", metavar="CODICE", help="Codici espansione (default: tutte tranne le escluse)")
+    parser.add_argument("--languages", nargs="+", help="Lingue (default: saved_state.json)")
+    parser.add_argument("--rarities", nargs="+", help="Rarità (default: saved_state.json)")
+    parser.add_argument("--min-price", type=float, default=1.0)
+    parser.add_argument("--max-price", type=float, default=1000.0)
+    parser.add_argument("--min-diff", type=float, default=1.0)
+    parser.add_argument("--only-zero", action="store_true", help="Solo venditori CardTrader Zero")
+    parser.add_argument("--output", help="File JSON lines su cui scrivere le opportunità (default: stdout)")
+    parser.add_argument("--webhook", help="URL a cui inviare ogni opportunità con una POST JSON")
+    parser.add_argument("--budget", type=float, default=REQUEST_BUDGET, help="Richieste al minuto")
+    parser.add_argument("--base-interval", type=float, default=BASE_INTERVAL, help="Secondi tra due scansioni di una carta")
+    parser.add_argument("--min-interval", type=float, default=MIN_INTERVAL, help="Intervallo minimo per carta")
+    parser.add_argument("--max-interval", type=float, default=MAX_INTERVAL, help="Intervallo massimo per carta")
+    parser.add_argument("--duration", type=float, help="Secondi dopo cui fermarsi (default: mai)")
+    parser.add_argument("--base-url", default=API_BASE_URL, help="URL dell'API (per i test con un server locale)")
+    parser.add_argument("--token", help="Token JWT (default: data/config.json)")
+    parser.add_argument("--metrics-interval", type=float, default=STATUS_INTERVAL,
+                        help="Secondi tra due righe JSON di metriche su stderr (0 per disattivarle)")
+    parser.add_argument("--no-store", action="store_true", help="Non salvare gli snapshot nell'archivio prezzi")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.webhook:
+        sink = WebhookSink(args.webhook)
+    else:
+        sink = JsonLinesSink(args.output, stream=sys.stdout)
+
+    # Con le opportunità su stdout i messaggi di stato vanno su stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        expansions_ids, languages, rarities = load_selection(args.expansions, args.languages, args.rarities)
+        if not languages or not rarities:
+            print("❌ Nessuna lingua o rarità selezionata")
+            return 1
+        cards_by_expansion = get_catalog().filter_cards(expansions_ids, rarities)
+        if not any(cards_by_expansion.values()):
+            print("❌ Nessuna carta corrisponde ai filtri")
+            return 1
+
+        rate = args.budget / 60
+        client = CardTraderClient(args.token or get_token(), base_url=args.base_url, rate=rate, burst=max(1.0, rate))
+        monitor = Monitor(
+            cards_by_expansion, languages, args.min_price, args.max_price, args.min_diff, args.only_zero, sink,
+            client, budget=args.budget, store=None if args.no_store else get_store(),
+            base_interval=args.base_interval, min_interval=args.min_interval, max_interval=args.max_interval
+        )
+        signal.signal(signal.SIGTERM, lambda signum, frame: monitor.stop())
+        reporter = MetricsReporter(get_metrics(), args.metrics_interval).start() if args.metrics_interval else None
+        try:
+            monitor.run(args.duration)
+        except KeyboardInterrupt:
+            print("\n🛑 Monitor interrotto")
+        finally:
+            client.close()
+            if reporter:
+                reporter.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from core.api_client import get_client
+from core.database_manager import get_store
+from core.metrics import get_metrics
+from core.price_analyzer import analyze_card_prices, analyze_columns, language_name
+from data.onepiece.catalog_index import get_catalog
+
+# Numero di richieste in volo contemporaneamente; il ritmo effettivo lo decide il rate limiter del client
+SCAN_WORKERS = 8
+
+# Sopra questa soglia di carte filtrate conviene scaricare l'intera espansione con una sola richiesta
+BULK_MIN_CARDS = 10
+
+# Offerte più economiche considerate per lingua: servono 3 posizioni per il salto 2°-3°
+RANK_DEPTH = 3
+
+
+# Convenienza minima (%) tra il prezzo più basso e il secondo perché una carta sia segnalata
+MIN_DIFF_PCT = 25
+
+
+def is_opportunity(analysis, min_price, max_price, min_diff):
+    return (
+        analysis['price1'] >= min_price and
+        analysis['price2'] <= max_price and
+        analysis['diff_abs'] >= min_diff and
+        analysis['diff_pct'] > MIN_DIFF_PCT
+    )
+
+
+def fetch_card_prices(blueprint_id, client=None):
+    client = client or get_client()
+    return client.fetch_marketplace_products(blueprint_id)
+
+
+def fetch_expansion_prices(expansion_id, blueprint_ids, client=None):
+    """Scarica le offerte di tutta l'espansione tenendo solo i blueprint richiesti.
+
+    Ritorna un dizionario {blueprint_id: offerte} nello stesso formato di fetch_card_prices
+    (vuoto se nessuna carta richiesta ha offerte), oppure None se la richiesta fallisce e
+    bisogna ripiegare sulle richieste per singola carta.
+    """
+    client = client or get_client()
+    wanted = {str(bp_id) for bp_id in blueprint_ids}
+    try:
+        groups = {
+            str(bp_id): products
+            for bp_id, products in client.stream_expansion_products(expansion_id)
+            if str(bp_id) in wanted
+        }
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"❌ Errore lettura offerte espansione {expansion_id}: {str(e)}")
+        return None
+    return groups
+
+
+def scan_card_prices(cards_by_expansion, client=None, max_workers=SCAN_WORKERS, bulk_min_cards=BULK_MIN_CARDS):
+    """Scarica i prezzi delle carte in parallelo e restituisce (card, prices_data) man mano che arrivano.
+
+    Per ogni espansione sceglie se fare una richiesta per carta o una sola richiesta
+    per tutta l'espansione, in base a quante carte hanno superato i filtri.
+    """
+    client = client or get_client()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit_cards(cards):
+            for card in cards:
+                pending[executor.submit(fetch_card_prices, card['id'], client)] = ("card", card)
+
+        for exp_id, cards in cards_by_expansion.items():
+            if len(cards) >= bulk_min_cards:
+                future = executor.submit(fetch_expansion_prices, exp_id, [card['id'] for card in cards], client)
+                pending[future] = ("expansion", cards)
+            else:
+                submit_cards(cards)
+
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    mode, payload = pending.pop(future)
+                    if mode == "card":
+                        yield payload, future.result()
+                        continue
+                    groups = future.result()
+                    if groups is None:
+                        submit_cards(payload)
+                        continue
+                    for card in payload:
+                        # Le carte senza offerte non compaiono nella risposta dell'espansione
+                        yield card, {str(card['id']): groups.get(str(card['id']), [])}
+        finally:
+            # Se il chiamante interrompe la scansione non avviamo le richieste ancora in coda
+            for future in pending:
+                future.cancel()
+
+
+def iter_card_analyses(cards_by_expansion, selected_languages, only_zero=False, rank_depth=RANK_DEPTH, client=None,
+                       max_workers=SCAN_WORKERS, bulk_min_cards=BULK_MIN_CARDS, store=None):
+    """Restituisce (card, analisi) per ogni carta, oppure (card, None) se i prezzi non sono disponibili.
+
+    I blueprint ancora validi nell'archivio locale vengono letti in colonne già filtrate
+    in SQL e analizzati in blocco; solo quelli scaduti vengono riscaricati e salvati.
+    """
+    metrics = get_metrics()
+    fresh = set()
+    if store is not None:
+        fresh = store.fresh_blueprints(card['id'] for cards in cards_by_expansion.values() for card in cards)
+    stale_by_expansion = {}
+    fresh_cards = []
+    for exp_id, cards in cards_by_expansion.items():
+        fresh_cards.extend(card for card in cards if card['id'] in fresh)
+        stale_by_expansion[exp_id] = [card for card in cards if card['id'] not in fresh]
+
+    if store is not None:
+        metrics.incr("cache.archivio.hit", len(fresh_cards))
+        metrics.incr("cache.archivio.miss", sum(len(cards) for cards in stale_by_expansion.values()))
+    if fresh_cards:
+        with metrics.timer("lettura_archivio"):
+            columns = store.load_columns([card['id'] for card in fresh_cards], selected_languages, only_zero)
+        with metrics.timer("analisi"):
+            cached = analyze_columns(*columns, selected_languages, only_zero, rank_depth)
+        for card in fresh_cards:
+            yield card, cached.get(card['id'], [])
+
+    try:
+        for card, prices_data in scan_card_prices(stale_by_expansion, client, max_workers, bulk_min_cards):
+            if prices_data is None:
+                yield card, None
+                continue
+            if store is not None:
+                store.add(card['id'], prices_data)
+            with metrics.timer("analisi"):
+                analyses = analyze_card_prices(prices_data, card['id'], selected_languages, only_zero, rank_depth)
+            yield card, analyses
+    finally:
+        if store is not None:
+            store.flush()
+
+
+def gap_2_3_text(analysis):
+    """Salto tra seconda e terza offerta, se ci sono almeno tre offerte"""
+    if len(analysis['gaps']) < 2:
+        return ""
+    gap = analysis['gaps'][1]
+    return f"P3: {analysis['prices'][2]}€ (2°-3°: {gap['diff_pct']}%) "
+
+
+def card_info_from_analysis(card, analysis):
+    """Dati di un'opportunità nel formato usato dal popup"""
+    prices = analysis['prices']
+    return {
+        "blueprint_id": card['id'],
+        "nome": f"{card['name']} ({language_name(analysis['language'])})",
+        "url": analysis["url"],
+        "img_url": card.get("image_url", ""),  # Assicurati che ci sia nel blueprint!
+        "p1": analysis["price1"],
+        "p2": analysis["price2"],
+        "p3": prices[2] if len(prices) > 2 else None,
+        "diff_pct": analysis["diff_pct"],
+        "diff_abs": analysis["diff_abs"],
+        "gaps": analysis["gaps"],
+        "product_id": analysis["product_id"]
+    }
+
+
+def search_opportunities_popup(expansions_ids, selected_languages, selected_rarities, min_price, max_price, min_diff, only_zero, callback,
+                               client=None, max_workers=SCAN_WORKERS, bulk_min_cards=BULK_MIN_CARDS, store=None):
+    store = store or get_store()
+    metrics = get_metrics()
+    start = metrics.snapshot()
+    with metrics.timer("catalogo"):
+        cards_by_expansion = get_catalog().filter_cards(expansions_ids, selected_rarities)
+
+    analizzate = 0
+    for card, analyses in iter_card_analyses(cards_by_expansion, selected_languages, only_zero, RANK_DEPTH,
+                                             client, max_workers, bulk_min_cards, store):
+        if analyses is None:
+            continue
+        metrics.incr("carte.analizzate")
+        analizzate += 1
+        for analysis in analyses:
+            if is_opportunity(analysis, min_price, max_price, min_diff):
+                callback(card_info_from_analysis(card, analysis), analizzate)
+        # Aggiorna comunque il progresso anche se nessuna carta trovata
+        callback({"update_only": True}, analizzate)
+
+    print(metrics.summary(since=start, title="Metriche scansione"))
+
+
+
+def search_opportunities(expansions_ids, selected_languages, selected_rarities, min_price, max_price, min_diff, only_zero):
+
+    # --- DEBUG: stampa i parametri selezionati ---
+    print("\n⚙️ Parametri di ricerca:")
+    print(f"- Espansioni selezionate: {expansions_ids}")
+    print(f"- Lingue selezionate: {selected_languages}")
+    print(f"- Rarità selezionate: {selected_rarities}\n")
+    print(f"- Solo carte CardTrader Zero: {only_zero}\n")
+    # ---------------------------------------------
+
+    cards_by_expansion = get_catalog().filter_cards(expansions_ids, selected_rarities)
+    for exp_id in expansions_ids:
+        if exp_id not in cards_by_expansion:
+            print(f"❌ File espansione {exp_id} non trovato")
+            continue
+        selected_cards = cards_by_expansion[exp_id]
+
+        print(f"\n🔍 Analizzo espansione {exp_id} - Carte compatibili con i filtri:")
+        for card in selected_cards:
+            print(f" - {card['name']} (Rarità: {card['rarity']}, ID: {card['id']})")
+
+        # Ricerca vera e propria
+        for card, analyses in iter_card_analyses({exp_id: selected_cards}, selected_languages, only_zero,
+                                                 store=get_store()):
+            if analyses is None:
+                continue
+
+            for analysis in analyses:
+                # Solo se la differenza supera il 25%
+                if is_opportunity(analysis, min_price, max_price, min_diff):
+                    lang_name = language_name(analysis['language'])
+                    print(
+                        f"{card['name']} ({lang_name}) - "
+                        f"P1: {analysis['price1']}€ P2: {analysis['price2']}€ "
+                        f"P%: {analysis['diff_pct']}% Diff: {analysis['diff_abs']}€ "
+                        f"{gap_2_3_text(analysis)}"
+                        f"Link: {analysis['url']}"
+                    )
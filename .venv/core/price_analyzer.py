@@ -0,0 +1,199 @@
+import heapq
+
+try:
+    import numpy as np
+except ImportError:  # La modalità a colonne è facoltativa
+    np = None
+
+HUB_SURCHARGE = 3  # Supplemento in euro per le offerte non spedibili via hub
+DEFAULT_RANK_DEPTH = 2
+
+LANG_NAMES = {
+    'en': 'Inglese',
+    'jp': 'Giapponese',
+    'fr': 'Francese',
+    'kr': 'Coreano',
+    'zh-cn': 'Cinese'
+}
+
+
+def language_name(code):
+    return LANG_NAMES.get(code, code.upper())
+
+
+def build_result(blueprint_id, lang, prices, product_id):
+    """Costruisce il risultato di una lingua a partire dai prezzi più bassi già ordinati"""
+    gaps = []
+    for rank in range(1, len(prices)):
+        low, high = prices[rank - 1], prices[rank]
+        diff_abs = high - low
+        gaps.append({
+            'ranks': (rank, rank + 1),
+            'diff_abs': round(diff_abs, 2),
+            'diff_pct': round((diff_abs / low) * 100 if low != 0 else 0, 2)
+        })
+
+    return {
+        'language': lang,
+        'price1': round(prices[0], 2),
+        'price2': round(prices[1], 2),
+        'diff_abs': gaps[0]['diff_abs'],
+        'diff_pct': gaps[0]['diff_pct'],
+        'url': f"https://www.cardtrader.com/cards/{blueprint_id}",
+        'product_id': product_id,
+        'prices': [round(price, 2) for price in prices],
+        'gaps': gaps
+    }
+
+
+def analyze_card_prices(prices_data, blueprint_id, selected_languages, only_zero=False, rank_depth=DEFAULT_RANK_DEPTH):
+    """Analizza le offerte di un blueprint in un solo passaggio.
+
+    Per ogni lingua tiene solo le `rank_depth` offerte più economiche (heap limitato)
+    e calcola i salti di prezzo tra posizioni consecutive (1°-2°, 2°-3°, ...).
+    """
+    if not prices_data or str(blueprint_id) not in prices_data:
+        return []
+
+    languages = {l.lower() for l in selected_languages}
+    depth = max(2, rank_depth)
+    heaps = {}
+
+    for seq, product in enumerate(prices_data[str(blueprint_id)]):
+        props = product['properties_hash']
+        if props.get('condition', '') != 'Near Mint':
+            continue
+        via_hub = product['user']['can_sell_via_hub']
+        if only_zero and not via_hub:
+            continue
+
+        lang = props.get('onepiece_language', '').lower()
+        if lang not in languages:
+            continue
+
+        price = product['price_cents'] / 100
+        if not via_hub:
+            price += HUB_SURCHARGE
+
+        # Heap di massimo sui prezzi: in cima c'è l'offerta più cara tra le migliori;
+        # a parità di prezzo vince l'offerta comparsa per prima
+        entry = (-price, -seq, product['id'])
+        heap = heaps.setdefault(lang, [])
+        if len(heap) < depth:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    results = []
+    for lang, heap in heaps.items():
+        if len(heap) < 2:
+            continue
+        best = sorted(heap, reverse=True)
+        results.append(build_result(blueprint_id, lang, [-entry[0] for entry in best], best[0][2]))
+
+    return results
+
+
+def analyze_columns(blueprint_ids, languages, conditions, zero, price_cents, product_ids,
+                    selected_languages, only_zero=False, rank_depth=DEFAULT_RANK_DEPTH):
+    """Analisi a colonne: ogni argomento è una colonna con un valore per offerta.
+
+    È il formato restituito da PriceStore.load_columns, così i dati in cache vengono
+    filtrati e ordinati senza ricostruire un dizionario per ogni offerta.
+    Ritorna {blueprint_id: risultati} per i blueprint con almeno un risultato.
+    Usa NumPy se installato, altrimenti un passaggio singolo in Python.
+    """
+    if not len(price_cents):
+        return {}
+    if np is None:
+        return analyze_columns_python(blueprint_ids, languages, conditions, zero, price_cents, product_ids,
+                                      selected_languages, only_zero, rank_depth)
+
+    depth = max(2, rank_depth)
+    selected = {l.lower() for l in selected_languages}
+
+    # Codifica lingue e condizioni come interi; lingue con la stessa forma minuscola coincidono
+    lang_codes = {}
+    lang_raw = {}
+    for language in languages:
+        if language not in lang_raw:
+            lang_raw[language] = lang_codes.setdefault(language.lower(), len(lang_codes))
+    lang_names = list(lang_codes)
+    lang_idx = np.fromiter(map(lang_raw.__getitem__, languages), dtype=np.int64, count=len(languages))
+    near_mint = np.fromiter(map('Near Mint'.__eq__, conditions), dtype=bool, count=len(conditions))
+
+    # Filtri vettoriali: condizione, lingua e CardTrader Zero
+    lang_selected = np.array([name in selected for name in lang_names])
+    zero = np.asarray(zero, dtype=bool)
+    mask = near_mint & lang_selected[lang_idx]
+    if only_zero:
+        mask &= zero
+
+    rows = np.flatnonzero(mask)
+    if not len(rows):
+        return {}
+    prices = np.asarray(price_cents, dtype=np.float64)[rows] / 100 + np.where(zero[rows], 0, HUB_SURCHARGE)
+    bp_values, bp_idx = np.unique(np.asarray(blueprint_ids)[rows], return_inverse=True)
+    group = bp_idx * len(lang_names) + lang_idx[rows]
+
+    # Ordina per gruppo (blueprint, lingua), poi per prezzo, poi per ordine di arrivo
+    order = np.lexsort((rows, prices, group))
+    group = group[order]
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    counts = np.diff(np.r_[starts, len(group)])
+    first_row = np.minimum.reduceat(rows[order], starts)
+
+    # I risultati di ogni blueprint seguono l'ordine di prima comparsa delle lingue
+    valid = np.flatnonzero(counts >= 2)
+    valid = valid[np.lexsort((first_row[valid], group[starts[valid]] // len(lang_names)))]
+
+    # Da qui in poi liste Python: l'accesso elemento per elemento agli array NumPy è lento
+    bp_values = bp_values.tolist()
+    sorted_prices = prices[order].tolist()
+    cheapest_rows = rows[order[starts[valid]]].tolist()
+    results = {}
+    for g, start, count, cheapest in zip(group[starts[valid]].tolist(), starts[valid].tolist(),
+                                         counts[valid].tolist(), cheapest_rows):
+        bp_id = bp_values[g // len(lang_names)]
+        results.setdefault(bp_id, []).append(build_result(
+            bp_id,
+            lang_names[g % len(lang_names)],
+            sorted_prices[start:start + min(count, depth)],
+            product_ids[cheapest]
+        ))
+
+    return results
+
+
+def analyze_columns_python(blueprint_ids, languages, conditions, zero, price_cents, product_ids,
+                           selected_languages, only_zero=False, rank_depth=DEFAULT_RANK_DEPTH):
+    """Come analyze_columns, con un heap limitato per (blueprint, lingua) come analyze_card_prices"""
+    selected = {l.lower() for l in selected_languages}
+    depth = max(2, rank_depth)
+    heaps = {}  # blueprint -> {lingua: heap}, in ordine di prima comparsa
+
+    for seq, (bp_id, lang, condition, via_hub, cents, product_id) in enumerate(
+            zip(blueprint_ids, languages, conditions, zero, price_cents, product_ids)):
+        if condition != 'Near Mint' or (only_zero and not via_hub):
+            continue
+        lang = lang.lower()
+        if lang not in selected:
+            continue
+        price = cents / 100 if via_hub else cents / 100 + HUB_SURCHARGE
+        entry = (-price, -seq, product_id)
+        heap = heaps.setdefault(bp_id, {}).setdefault(lang, [])
+        if len(heap) < depth:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    results = {}
+    for bp_id, by_lang in heaps.items():
+        for lang, heap in by_lang.items():
+            if len(heap) < 2:
+                continue
+            best = sorted(heap, reverse=True)
+            results.setdefault(bp_id, []).append(
+                build_result(bp_id, lang, [-entry[0] for entry in best], best[0][2])
+            )
+    return results
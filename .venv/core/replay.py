@@ -0,0 +1,116 @@
+# core/replay.py
+"""Registrazione e riproduzione delle risposte API, per benchmark end-to-end ripetibili e offline.
+
+Gli adapter si montano sulla Session di CardTraderClient: `RecordingAdapter` inoltra le
+richieste alla rete e salva ogni risposta su disco, `ReplayAdapter` risponde dai file
+salvati senza toccare la rete.
+"""
+import hashlib
+import io
+import json
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+from core.file_manager import atomic_write
+
+INDEX_FILE = "index.json"
+# Intestazioni da conservare: le altre (cookie, date, id di tracciamento) non servono a riprodurre
+KEPT_HEADERS = {"content-type", "retry-after"}
+
+
+def request_key(request):
+    """Chiave stabile di una richiesta: metodo, percorso e parametri ordinati (host e token esclusi)"""
+    parts = urlsplit(request.url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{request.method} {parts.path}?{query}"
+
+
+class Cassette:
+    """Cartella con un file per risposta registrata e un indice chiave -> file"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.lock = threading.Lock()
+        self.index = {}
+        index_file = self.directory / INDEX_FILE
+        if index_file.exists():
+            with open(index_file, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def save(self, key, status, headers, body):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:24] + ".body"
+        with open(self.directory / name, "wb") as f:
+            f.write(body)
+        with self.lock:
+            self.index[key] = {"status": status, "headers": headers, "file": name}
+
+    def load(self, key):
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        with open(self.directory / entry["file"], "rb") as f:
+            return entry["status"], entry["headers"], f.read()
+
+    def write_index(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            with atomic_write(self.directory / INDEX_FILE) as f:
+                json.dump(self.index, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Esegue le richieste reali e salva le risposte andate a buon fine nella cassetta"""
+
+    def __init__(self, cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        # Le risposte 429/5xx non si registrano: in riproduzione si vuole il dato, non l'errore
+        if response.status_code < 400:
+            headers = {k.lower(): v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS}
+            # Legge il corpo intero: anche con stream=True iter_content lo riusa dalla memoria
+            self.cassette.save(request_key(request), response.status_code, headers, response.content)
+        return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Risponde dalla cassetta; una richiesta mai registrata riceve 404 invece di andare in rete"""
+
+    def __init__(self, cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+        self.misses = []
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        key = request_key(request)
+        recorded = self.cassette.load(key)
+        if recorded is None:
+            self.misses.append(key)
+            status, headers, body = 404, {"content-type": "application/json"}, b'{"error": "non registrata"}'
+        else:
+            status, headers, body = recorded
+        raw = HTTPResponse(
+            body=io.BytesIO(body), headers=headers, status=status,
+            preload_content=False, decode_content=False
+        )
+        return self.build_response(request, raw)
+
+
+def mount(client, adapter):
+    """Sostituisce il trasporto della Session del client con l'adapter indicato"""
+    client.session.mount("http://", adapter)
+    client.session.mount("https://", adapter)
+    return adapter
@@ -0,0 +1,197 @@
+# data/onepiece/catalog_index.py
+import json
+import os
+import pickle
+import threading
+from pathlib import Path
+
+from core.file_manager import atomic_write
+
+BASE_DIR = Path(__file__).resolve().parent
+BLUEPRINTS_DIR = BASE_DIR / "blueprints"
+EXPANSIONS_FILE = BASE_DIR / "expansions.json"
+CACHE_FILE = BASE_DIR / "catalog_cache.pickle"
+
+CACHE_VERSION = 1
+
+
+def expansion_key(stem):
+    """Gli ID numerici delle espansioni restano interi, come in expansions.json"""
+    return int(stem) if stem.isdigit() else stem
+
+
+class CatalogIndex:
+    """Indice in memoria dei blueprint, ricaricato solo per i file modificati.
+
+    Le carte sono indicizzate per ID, espansione, rarità e numero collezione; lo stato
+    viene salvato in una cache binaria così all'avvio non si rilegge tutto il JSON.
+    """
+
+    def __init__(self, blueprints_dir=BLUEPRINTS_DIR, expansions_file=EXPANSIONS_FILE, cache_file=CACHE_FILE):
+        self.blueprints_dir = Path(blueprints_dir)
+        self.expansions_file = Path(expansions_file)
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.lock = threading.RLock()
+
+        self.files = {}  # nome file -> (mtime_ns, size, carte)
+        self.expansions_entry = None  # (mtime_ns, size, espansioni)
+        self.by_id = None
+        self.load_cache()
+        self.refresh()
+
+    def load_cache(self):
+        if not self.cache_file or not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, "rb") as f:
+                cache = pickle.load(f)
+            if cache.get("version") == CACHE_VERSION:
+                self.files = cache["files"]
+                self.expansions_entry = cache["expansions"]
+        except Exception as e:
+            print(f"⚠️ Cache catalogo non valida, verrà ricostruita: {str(e)}")
+            self.files = {}
+            self.expansions_entry = None
+
+    def save_cache(self):
+        if not self.cache_file:
+            return
+        try:
+            with atomic_write(self.cache_file, "wb") as f:
+                pickle.dump(
+                    {"version": CACHE_VERSION, "files": self.files, "expansions": self.expansions_entry},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL
+                )
+        except OSError as e:
+            print(f"⚠️ Impossibile salvare la cache del catalogo: {str(e)}")
+
+    def refresh(self):
+        """Rilegge solo i file il cui mtime o dimensione sono cambiati; ritorna True se qualcosa è cambiato"""
+        with self.lock:
+            changed = False
+            seen = set()
+
+            if self.blueprints_dir.exists():
+                for entry in os.scandir(self.blueprints_dir):
+                    if not entry.name.endswith(".json"):
+                        continue
+                    seen.add(entry.name)
+                    stat = entry.stat()
+                    cached = self.files.get(entry.name)
+                    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                        continue
+                    try:
+                        with open(entry.path, "r", encoding="utf-8") as f:
+                            cards = json.load(f)
+                    except (OSError, json.JSONDecodeError) as e:
+                        print(f"❌ Errore lettura file {entry.name}: {str(e)}")
+                        continue
+                    self.files[entry.name] = (stat.st_mtime_ns, stat.st_size, cards)
+                    changed = True
+
+            for name in set(self.files) - seen:
+                del self.files[name]
+                changed = True
+
+            if self.expansions_file.exists():
+                stat = self.expansions_file.stat()
+                cached = self.expansions_entry
+                if not cached or cached[0] != stat.st_mtime_ns or cached[1] != stat.st_size:
+                    try:
+                        with open(self.expansions_file, "r", encoding="utf-8") as f:
+                            self.expansions_entry = (stat.st_mtime_ns, stat.st_size, json.load(f))
+                        changed = True
+                    except (OSError, json.JSONDecodeError) as e:
+                        print(f"❌ Errore nel caricamento delle espansioni: {str(e)}")
+
+            if changed or self.by_id is None:
+                self.build_indexes()
+            if changed:
+                self.save_cache()
+            return changed
+
+    def build_indexes(self):
+        """Costruisce gli indici in variabili locali e li sostituisce tutti insieme sotto il lock,
+        così chi legge non vede mai un indice costruito a metà"""
+        by_expansion = {}
+        by_id = {}
+        by_rarity = {}
+        by_collector_number = {}
+        rarity_counts = {}
+
+        for name, (_, _, cards) in self.files.items():
+            exp_id = expansion_key(Path(name).stem)
+            by_expansion[exp_id] = cards
+            for card in cards:
+                rarity = card.get('rarity', '')
+                by_id[card['id']] = card
+                by_rarity.setdefault(rarity, []).append(card)
+                by_collector_number.setdefault(card.get('collector_number', ''), []).append(card)
+                rarity_counts[(exp_id, rarity)] = rarity_counts.get((exp_id, rarity), 0) + 1
+
+        expansions = self.expansions_entry[2] if self.expansions_entry else []
+        expansion_ids = {exp["code"]: exp["id"] for exp in expansions}
+
+        with self.lock:
+            (self.by_expansion, self.by_id, self.by_rarity, self.by_collector_number, self.rarity_counts,
+             self.expansion_list, self.expansion_ids) = (
+                by_expansion, by_id, by_rarity, by_collector_number, rarity_counts, expansions, expansion_ids
+            )
+
+    def expansions(self):
+        return self.expansion_list
+
+    def expansion_id(self, code):
+        return self.expansion_ids.get(code)
+
+    def cards(self, exp_id):
+        """Carte di un'espansione nell'ordine del file (lista condivisa: non modificarla)"""
+        return self.by_expansion.get(exp_id, [])
+
+    def card(self, blueprint_id):
+        return self.by_id.get(blueprint_id)
+
+    def cards_by_rarity(self, rarity):
+        return self.by_rarity.get(rarity, [])
+
+    def cards_by_collector_number(self, collector_number):
+        return self.by_collector_number.get(collector_number, [])
+
+    def filter_cards(self, expansions_ids, rarities):
+        """Carte delle espansioni indicate con una delle rarità richieste, raggruppate per espansione"""
+        rarities = set(rarities)
+        with self.lock:
+            by_expansion = self.by_expansion
+        return {
+            exp_id: [card for card in by_expansion[exp_id] if card.get('rarity', '') in rarities]
+            for exp_id in expansions_ids
+            if exp_id in by_expansion
+        }
+
+    def count_cards(self, expansions_ids, rarities=None):
+        """Numero di carte delle espansioni indicate, eventualmente solo per alcune rarità"""
+        with self.lock:
+            by_expansion, rarity_counts = self.by_expansion, self.rarity_counts
+        if rarities is None:
+            return sum(len(by_expansion.get(exp_id, [])) for exp_id in expansions_ids)
+        return sum(
+            rarity_counts.get((exp_id, rarity), 0)
+            for exp_id in expansions_ids
+            for rarity in set(rarities)
+        )
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Restituisce l'indice condiviso, aggiornato con i file modificati su disco"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = CatalogIndex()
+        else:
+            _catalog.refresh()
+        return _catalog
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+from core.api_client import get_client
+from core.file_manager import atomic_write
+from core.metrics import get_metrics
+from data.onepiece.catalog_index import get_catalog, EXPANSIONS_FILE
+
+BLUEPRINTS_DIR = Path(__file__).resolve().parent / "blueprints"
+HASHES_FILE = Path(__file__).resolve().parent / "blueprint_hashes.json"
+UPDATE_WORKERS = 6
+
+
+def load_expansions():
+    """Carica la lista delle espansioni dall'indice del catalogo"""
+    expansions = get_catalog().expansions()
+    if not expansions:
+        raise FileNotFoundError(f"❌ File {EXPANSIONS_FILE} non trovato o vuoto!")
+    return expansions
+
+
+def load_hashes():
+    """Carica gli hash dell'ultimo export scaricato per ogni espansione"""
+    try:
+        with open(HASHES_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_json_atomic(path, data, **kwargs):
+    """Scrive il JSON con atomic_write: chi legge vede sempre il file vecchio o quello nuovo"""
+    with atomic_write(path) as f:
+        json.dump(data, f, ensure_ascii=False, **kwargs)
+
+
+def fetch_blueprints(expansion_id, client=None):
+    """Recupera l'export dei blueprint di un'espansione come byte grezzi"""
+    client = client or get_client()
+    return client.get_raw("/blueprints/export", params={"expansion_id": expansion_id}, timeout=30)
+
+
+def process_blueprints(raw_blueprints):
+    """Filtra e processa i blueprint per mantenere solo i dati necessari"""
+    processed = []
+    for bp in raw_blueprints:
+        if bp.get("category_id") != 192:  # Filtra solo le carte
+            continue
+
+        processed.append({
+            "id": bp["id"],
+            "name": bp["name"],
+            "rarity": bp.get("fixed_properties", {}).get("onepiece_rarity", "Unknown"),
+            "collector_number": bp.get("fixed_properties", {}).get("collector_number", ""),
+            "image_url": f"https://cardtrader.com{bp['image']['url']}" if bp.get("image") else None,
+            "card_url": f"https://www.cardtrader.com/cards/{bp['id']}",
+            "card_market_ids": bp.get("card_market_ids", [])
+        })
+    return processed
+
+
+def update_expansion(exp, local_data, previous_hash, client):
+    """Aggiorna il file di un'espansione; ritorna (dettagli o None, hash dell'export)"""
+    exp_id = exp["id"]
+    exp_code = exp["code"]
+    local_file = BLUEPRINTS_DIR / f"{exp_id}.json"
+
+    # 1. Recupera dati remoti
+    raw_remote = fetch_blueprints(exp_id, client)
+    if not raw_remote:
+        print(f"⚠️ Nessun dato remoto trovato per l'espansione {exp_code}")
+        return None, previous_hash
+
+    # Export identico all'ultimo scaricato: niente parsing né confronto
+    metrics = get_metrics()
+    content_hash = hashlib.sha256(raw_remote).hexdigest()
+    if content_hash == previous_hash and local_file.exists():
+        metrics.incr("cache.export.hit")
+        print(f"✅ {exp_code}: export invariato")
+        return None, content_hash
+    metrics.incr("cache.export.miss")
+
+    try:
+        with metrics.timer("parsing_export"):
+            remote_data = process_blueprints(json.loads(raw_remote))
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"❌ Export non valido per l'espansione {exp_code}: {str(e)}")
+        return None, previous_hash
+    if not remote_data:
+        print(f"⚠️ Nessuna carta valida trovata per l'espansione {exp_code}")
+        return None, content_hash
+
+    # 2. Nessun file locale: lo creiamo
+    if not local_file.exists():
+        print(f"⚠️ {exp_code}: file locale non trovato, creazione nuovo file...")
+        write_json_atomic(local_file, remote_data, indent=2)
+        return {"action": "created", "new_cards": len(remote_data)}, content_hash
+
+    # 3. Confronta i dati
+    local_dict = {card["id"]: card for card in local_data}
+    remote_dict = {card["id"]: card for card in remote_data}
+
+    new_cards = [card for card_id, card in remote_dict.items() if card_id not in local_dict]
+    updated_cards = [
+        card for card_id, card in remote_dict.items()
+        if card_id in local_dict and local_dict[card_id] != card
+    ]
+
+    # 4. Applica aggiornamenti se necessario
+    if not new_cards and not updated_cards:
+        print(f"✅ {exp_code}: nessun aggiornamento necessario")
+        return None, content_hash
+
+    write_json_atomic(local_file, list(remote_dict.values()), indent=2)
+    print(f"✅ {exp_code}: trovati {len(new_cards)} nuove carte e {len(updated_cards)} aggiornamenti")
+    return {
+        "new_cards": len(new_cards),
+        "updated_cards": len(updated_cards),
+        "cards": new_cards + updated_cards
+    }, content_hash
+
+
+def check_and_update_cards(expansion_code=None, progress_callback=None, client=None, max_workers=UPDATE_WORKERS):
+    """Aggiorna le carte di tutte le espansioni (o di una sola) scaricando gli export in parallelo.
+
+    `progress_callback(completate, totale, codice)` viene chiamata al termine di ogni espansione.
+    """
+    if expansion_code:
+        print(f"🔍 Processing expansion: {expansion_code}")
+
+    client = client or get_client()
+    metrics = get_metrics()
+    start = metrics.snapshot()
+    catalog = get_catalog()
+    expansions = load_expansions()
+    if expansion_code:
+        expansions = [exp for exp in expansions if exp["code"] == expansion_code]
+
+    update_report = {
+        "total_expansions": len(expansions),
+        "updated_expansions": 0,
+        "new_cards": 0,
+        "updated_cards": 0,
+        "details": {}
+    }
+
+    print("🔍 Inizio controllo aggiornamenti carte...")
+
+    hashes = load_hashes()
+    completed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                update_expansion, exp, catalog.cards(exp["id"]), hashes.get(str(exp["id"])), client
+            ): exp
+            for exp in expansions
+        }
+        for future in as_completed(futures):
+            exp = futures[future]
+            try:
+                details, content_hash = future.result()
+            except OSError as e:
+                print(f"❌ Errore nel salvataggio dell'espansione {exp['code']}: {str(e)}")
+                details, content_hash = None, None
+
+            if content_hash:
+                hashes[str(exp["id"])] = content_hash
+            if details:
+                update_report["details"][exp["code"]] = details
+                update_report["new_cards"] += details["new_cards"]
+                update_report["updated_cards"] += details.get("updated_cards", 0)
+                update_report["updated_expansions"] += 1
+
+            completed += 1
+            if progress_callback:
+                progress_callback(completed, len(expansions), exp["code"])
+
+    write_json_atomic(HASHES_FILE, hashes, indent=2)
+    print(metrics.summary(since=start, title="Metriche aggiornamento carte"))
+    return update_report
+
+
+# Per testare prima dell'integrazione nell'interfaccia
+if __name__ == "__main__":
+    report = check_and_update_cards()
+    print("\n📊 Report finale:")
+    print(f"• Espansioni aggiornate: {report['updated_expansions']}/{report['total_expansions']}")
+    print(f"• Nuove carte: {report['new_cards']}")
+    print(f"• Carte aggiornate: {report['updated_cards']}")
+
+    for exp_code, details in report["details"].items():
+        print(f"\n📦 Espansione {exp_code}:")
+        if "action" in details:
+            print(f"• Creato nuovo file con {details['new_cards']} carte")
+        else:
+            print(f"• Nuove carte: {details['new_cards']}")
+            print(f"• Carte aggiornate: {details['updated_cards']}")
@@ -0,0 +1,339 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from PIL import ImageTk
+from collections import OrderedDict
+import queue
+import threading
+import requests
+import webbrowser
+from core.metrics import get_metrics
+from data.onepiece.state_manager import get_token
+from gui.components.thumbnail_loader import get_thumbnail_loader, THUMB_SIZE
+
+FRAME_MS = 50  # Intervallo tra due aggiornamenti dell'interfaccia (~20 al secondo)
+MAX_BATCH = 1000  # Messaggi al massimo gestiti per ogni aggiornamento
+ROW_HEIGHT = 126  # Altezza fissa di una riga: miniatura 110px più i bordi
+MAX_MINIATURE = 200  # PhotoImage tenute in memoria; le altre si ricaricano dalla cache su disco
+
+ORDINAMENTI = {
+    "Convenienza %": "diff_pct",
+    "Differenza €": "diff_abs",
+    "Prezzo": "p1"
+}
+
+
+class RigaCarta:
+    """Riga riutilizzabile della lista: i widget restano, cambia solo la carta mostrata"""
+
+    def __init__(self, popup):
+        self.popup = popup
+        self.card = None
+
+        self.frame = tk.Frame(popup.canvas, borderwidth=2, relief="groove", padx=4, pady=4)
+        self.item = popup.canvas.create_window(0, 0, window=self.frame, anchor="nw", height=ROW_HEIGHT - 4)
+
+        # Miniatura cliccabile
+        self.img_label = tk.Label(self.frame, image=popup.placeholder, cursor="hand2")
+        self.img_label.pack(side="left", padx=5)
+        self.img_label.bind("<Button-1>", lambda e: self.card and webbrowser.open(self.card['url']))
+
+        # Info testo
+        info = tk.Frame(self.frame)
+        info.pack(side="left", fill="x", expand=True)
+        self.nome = tk.Label(info, font=("Arial", 14, "bold"))
+        self.nome.pack(anchor="w")
+        self.prezzi = tk.Label(info, font=("Arial", 12))
+        self.prezzi.pack(anchor="w")
+        self.convenienza = tk.Label(info, font=("Arial", 12, "italic"))
+        self.convenienza.pack(anchor="w")
+
+        # Pulsante aggiungi al carrello
+        self.btn = tk.Button(self.frame, command=lambda: self.card and popup.aggiungi_al_carrello(self.card))
+        self.btn.pack(side="right", padx=10)
+
+    def mostra(self, card_info, y, width):
+        canvas = self.popup.canvas
+        canvas.coords(self.item, 0, y)
+        canvas.itemconfigure(self.item, width=width, state="normal")
+
+        if card_info is not self.card:
+            self.card = card_info
+            self.nome.config(text=f"{card_info['nome']}")
+            prezzi = f"P1: {card_info['p1']}€   P2: {card_info['p2']}€"
+            if card_info.get('p3') is not None:
+                prezzi += f"   P3: {card_info['p3']}€"
+            self.prezzi.config(text=prezzi)
+            self.convenienza.config(text=f"Convenienza: {card_info['diff_pct']}%   ({card_info['diff_abs']}€)")
+        self.mostra_miniatura()
+        self.mostra_carrello()
+
+    def mostra_miniatura(self):
+        photo = self.popup.miniatura(self.card)
+        self.img_label.config(image=photo)
+        self.img_label.image = photo  # evita garbage collection
+
+    def mostra_carrello(self):
+        stato = self.card.get('carrello')
+        if stato == "in_corso":
+            self.btn.config(text="Aggiungendo...", bg="SystemButtonFace", fg="black", state=tk.DISABLED)
+        elif stato == "ok":
+            self.btn.config(text="✓ Aggiunto", bg="green", fg="white", state=tk.DISABLED)
+        elif stato == "errore":
+            self.btn.config(text="❌ Errore", bg="red", fg="white", state=tk.NORMAL)
+        else:
+            self.btn.config(text="Aggiungi al carrello", bg="SystemButtonFace", fg="black", state=tk.NORMAL)
+
+    def nascondi(self):
+        self.card = None
+        self.popup.canvas.itemconfigure(self.item, state="hidden")
+
+
+class RicercaPopup(tk.Toplevel):
+    def __init__(self, master, totale_carte):
+        super().__init__(master)
+        self.title(f"Ricerca in corso 0/{totale_carte} Carte analizzate")
+        self.geometry("900x600")
+        self.resizable(True, True)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.master = master
+        self.totale_carte = totale_carte
+        self.carte_analizzate = 0
+
+        # I thread di ricerca scrivono solo sulla coda; l'interfaccia la svuota a intervalli fissi
+        self.coda = queue.Queue()
+        self.chiuso = False
+        self.risultati = []  # Tutte le carte trovate
+        self.visibili = []  # Carte dopo filtri e ordinamento
+        self.righe = []  # Pool di righe riutilizzabili
+
+        # Miniature caricate in background; grigio finché non sono pronte
+        self.thumbnails = get_thumbnail_loader()
+        self.placeholder = tk.PhotoImage(width=THUMB_SIZE[0], height=THUMB_SIZE[1])
+        self.placeholder.put("#d9d9d9", to=(0, 0, THUMB_SIZE[0], THUMB_SIZE[1]))
+        self.miniature = OrderedDict()  # blueprint_id -> PhotoImage, in ordine di utilizzo
+        self.miniature_richieste = set()
+
+        self.crea_barra_filtri()
+
+        # Area scrollabile virtualizzata: esistono solo le righe visibili
+        self.canvas = tk.Canvas(self, borderwidth=0, yscrollincrement=ROW_HEIGHT // 3)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.on_scroll, scrollregion=(0, 0, 0, 0))
+
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda e: self.render())
+
+        # Sulla Toplevel: la rotella funziona anche sopra le righe
+        self.bind("<MouseWheel>", self.on_mousewheel)  # Windows
+        self.bind("<Button-4>", self.on_mousewheel)  # Linux (scroll up)
+        self.bind("<Button-5>", self.on_mousewheel)  # Linux (scroll down)
+
+        # Blocca la main window
+        self.master.attributes("-disabled", True)
+
+        self.after_id = self.after(FRAME_MS, self.svuota_coda)
+
+    def crea_barra_filtri(self):
+        barra = ttk.Frame(self)
+        barra.pack(side="top", fill="x", padx=5, pady=5)
+
+        self.ordina_var = tk.StringVar(value="Convenienza %")
+        self.decrescente_var = tk.BooleanVar(value=True)
+        self.min_pct_var = tk.StringVar(value="")
+        self.min_diff_var = tk.StringVar(value="")
+        self.max_prezzo_var = tk.StringVar(value="")
+
+        ttk.Label(barra, text="Ordina per:").pack(side="left")
+        ttk.Combobox(
+            barra, textvariable=self.ordina_var, values=list(ORDINAMENTI), state="readonly", width=14
+        ).pack(side="left", padx=(2, 5))
+        ttk.Checkbutton(barra, text="Decrescente", variable=self.decrescente_var).pack(side="left", padx=(0, 15))
+
+        for testo, var in (("Conv. min (%):", self.min_pct_var),
+                           ("Diff. min (€):", self.min_diff_var),
+                           ("Prezzo max (€):", self.max_prezzo_var)):
+            ttk.Label(barra, text=testo).pack(side="left")
+            ttk.Entry(barra, textvariable=var, width=7).pack(side="left", padx=(2, 10))
+
+        for var in (self.ordina_var, self.decrescente_var, self.min_pct_var, self.min_diff_var, self.max_prezzo_var):
+            var.trace_add("write", lambda *args: self.aggiorna_vista())
+
+    def on_mousewheel(self, event):
+        # Gestione diversa tra Windows e Linux
+        if event.num == 4 or event.num == 5:
+            # Linux
+            delta = 1 if event.num == 5 else -1
+        else:
+            # Windows
+            delta = 1 if event.delta < 0 else -1
+
+        self.canvas.yview_scroll(delta, "units")
+        # Questo evita che l'evento si propaghi alla finestra principale
+        return "break"
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.render()
+
+    def aggiorna_titolo(self):
+        self.title("Ricerca in corso {}/{} Carte analizzate".format(self.carte_analizzate, self.totale_carte))
+
+    def accoda(self, card_info, analizzate):
+        """Thread-safe: chiamata dal thread di ricerca per ogni carta analizzata"""
+        if not self.chiuso:
+            self.coda.put(("carta", card_info, analizzate))
+
+    def svuota_coda(self):
+        """Gestisce in un colpo solo tutti i messaggi arrivati dall'ultimo aggiornamento"""
+        analizzate = None
+        nuove = []
+        ridisegna = False
+
+        for _ in range(MAX_BATCH):
+            try:
+                messaggio = self.coda.get_nowait()
+            except queue.Empty:
+                break
+            tipo = messaggio[0]
+            if tipo == "carta":
+                analizzate = messaggio[2]
+                if self.aggiungi_carta(messaggio[1]):
+                    nuove.append(messaggio[1])
+            elif tipo == "miniatura":
+                self.salva_miniatura(messaggio[1], messaggio[2])
+                ridisegna = True
+            elif tipo == "carrello":
+                messaggio[1]['carrello'] = messaggio[2]
+                ridisegna = True
+
+        # Solo i frame con qualcosa da disegnare contano nel tempo speso in Tk
+        if analizzate is not None or nuove or ridisegna:
+            with get_metrics().timer("tk.aggiornamento"):
+                if analizzate is not None:
+                    self.aggiorna_progresso(analizzate)
+                if nuove:
+                    self.aggiorna_vista(nuove)
+                elif ridisegna:
+                    self.render()
+
+        self.after_id = self.after(FRAME_MS, self.svuota_coda)
+
+    def aggiungi_carta(self, card_info):
+        """Aggiunge la carta ai risultati; ritorna True se è un nuovo risultato da mostrare"""
+        # Verifica che card_info non sia None e non sia solo per aggiornamento
+        if card_info is None or card_info.get("update_only"):
+            return False
+        card_info['carrello'] = None
+        self.risultati.append(card_info)
+        return True
+
+    def soglia(self, var):
+        try:
+            return float(var.get().replace(",", "."))
+        except ValueError:
+            return None
+
+    def aggiorna_vista(self, nuove=None):
+        """Riapplica filtri e ordinamento e ridisegna solo le righe visibili.
+
+        Con `nuove` filtra solo le carte appena arrivate e le unisce alla lista già
+        ordinata: il sort di Python fonde le due sequenze ordinate in tempo lineare.
+        """
+        min_pct = self.soglia(self.min_pct_var)
+        min_diff = self.soglia(self.min_diff_var)
+        max_prezzo = self.soglia(self.max_prezzo_var)
+
+        candidate = self.risultati if nuove is None else nuove
+        filtrate = [
+            card for card in candidate
+            if (min_pct is None or card['diff_pct'] >= min_pct)
+            and (min_diff is None or card['diff_abs'] >= min_diff)
+            and (max_prezzo is None or card['p1'] <= max_prezzo)
+        ]
+        visibili = filtrate if nuove is None else self.visibili + filtrate
+        chiave = ORDINAMENTI.get(self.ordina_var.get())
+        if chiave:
+            visibili.sort(key=lambda card: card[chiave], reverse=self.decrescente_var.get())
+
+        self.visibili = visibili
+        self.canvas.configure(scrollregion=(0, 0, 0, len(visibili) * ROW_HEIGHT))
+        self.render()
+
+    def render(self):
+        """Posiziona il pool di righe sulle carte attualmente visibili nella finestra"""
+        if self.chiuso:
+            return
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        first = max(0, int(self.canvas.canvasy(0) // ROW_HEIGHT))
+        count = max(0, min(len(self.visibili) - first, height // ROW_HEIGHT + 2))
+
+        while len(self.righe) < count:
+            self.righe.append(RigaCarta(self))
+
+        for i, riga in enumerate(self.righe):
+            if i < count:
+                riga.mostra(self.visibili[first + i], (first + i) * ROW_HEIGHT, width)
+            else:
+                riga.nascondi()
+
+    def miniatura(self, card_info):
+        """PhotoImage della carta se pronta, altrimenti il segnaposto (e parte il caricamento)"""
+        key = card_info['blueprint_id']
+        photo = self.miniature.get(key)
+        if photo is not None:
+            self.miniature.move_to_end(key)
+            return photo
+        if key not in self.miniature_richieste:
+            self.miniature_richieste.add(key)
+            self.thumbnails.request(key, card_info['img_url'], lambda img: self.coda.put(("miniatura", key, img)))
+        return self.placeholder
+
+    def salva_miniatura(self, key, img):
+        self.miniature_richieste.discard(key)
+        if img is None:
+            # Niente immagine: resta il segnaposto, senza richiederla di nuovo a ogni ridisegno
+            self.miniature[key] = self.placeholder
+        else:
+            self.miniature[key] = ImageTk.PhotoImage(img)
+        while len(self.miniature) > MAX_MINIATURE:
+            self.miniature.popitem(last=False)
+
+    def aggiungi_al_carrello(self, card_info):
+        if card_info.get('carrello') in ("in_corso", "ok"):
+            return
+        card_info['carrello'] = "in_corso"
+        self.render()
+        threading.Thread(target=self.invia_al_carrello, args=(card_info,), daemon=True).start()
+
+    def invia_al_carrello(self, card_info):
+        """Eseguita in un thread separato; l'esito torna all'interfaccia tramite la coda"""
+        try:
+            token = get_token()
+            url = "https://api.cardtrader.com/api/v2/cart/add"
+            headers = {
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/json"
+            }
+            data = {
+                "product_id": card_info['product_id'],
+                "quantity": 1,
+                "via_cardtrader_zero": True
+            }
+            resp = requests.post(url, headers=headers, json=data, timeout=10)
+            esito = "ok" if resp.status_code == 200 else "errore"
+        except Exception:
+            esito = "errore"
+        self.coda.put(("carrello", card_info, esito))
+
+    def aggiorna_progresso(self, analizzate):
+        self.carte_analizzate = analizzate
+        self.aggiorna_titolo()
+
+    def on_close(self):
+        self.chiuso = True
+        self.after_cancel(self.after_id)
+        # Rendi di nuovo la main window attiva
+        self.master.attributes("-disabled", False)
+        self.destroy()
@@ -0,0 +1,148 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from PIL import Image
+
+from core.file_manager import atomic_write
+from core.metrics import get_metrics
+
+THUMB_SIZE = (80, 110)
+CACHE_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "onepiece" / "thumbnails"
+MAX_CACHE_BYTES = 30 * 1024 * 1024
+THUMB_WORKERS = 4
+
+
+class ThumbnailLoader:
+    """Scarica e ridimensiona le miniature in background, con cache su disco a dimensione limitata (LRU).
+
+    Le miniature sono salvate già ridimensionate come `<blueprint_id>.jpg`; il thread Tk
+    riceve un'immagine PIL già decodificata e deve solo creare la PhotoImage.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, workers=THUMB_WORKERS):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+        self.session = requests.Session()
+        # RLock: add_done_callback esegue subito forget se il future è già completato
+        self.lock = threading.RLock()
+        self.inflight = {}
+
+        # Voci della cache in ordine di ultimo utilizzo (la più vecchia per prima)
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = sorted(
+            (entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".jpg")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in files:
+            size = entry.stat().st_size
+            self.entries[entry.name[:-4]] = size
+            self.total_bytes += size
+
+    def path(self, key):
+        return self.cache_dir / f"{key}.jpg"
+
+    def touch(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+
+    def store(self, key, image):
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=85)
+        data = buffer.getvalue()
+        with atomic_write(self.path(key), "wb") as f:
+            f.write(data)
+
+        with self.lock:
+            self.total_bytes += len(data) - self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            # Elimina le miniature usate meno di recente finché non si rientra nel limite
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key, old_size = self.entries.popitem(last=False)
+                self.total_bytes -= old_size
+                try:
+                    os.remove(self.path(old_key))
+                except OSError:
+                    pass
+
+    def load(self, key, url):
+        """Eseguita nei worker: legge dalla cache o scarica, ritorna un'immagine PIL o None"""
+        cached = self.path(key)
+        if key in self.entries and cached.exists():
+            try:
+                image = Image.open(cached)
+                image.load()
+                self.touch(key)
+                get_metrics().incr("cache.miniature.hit")
+                return image
+            except OSError:
+                pass
+
+        get_metrics().incr("cache.miniature.miss")
+        if not url:
+            return None
+        try:
+            with get_metrics().timer("download_miniature"):
+                response = self.session.get(url, timeout=10)
+                response.raise_for_status()
+                image = Image.open(io.BytesIO(response.content)).convert("RGB").resize(THUMB_SIZE)
+        except (requests.exceptions.RequestException, OSError) as e:
+            print(f"⚠️ Miniatura non disponibile per {key}: {str(e)}")
+            return None
+        try:
+            self.store(key, image)
+        except OSError as e:
+            print(f"⚠️ Impossibile salvare la miniatura {key}: {str(e)}")
+        return image
+
+    def submit(self, key, url):
+        key = str(key)
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is None:
+                future = self.executor.submit(self.load, key, url)
+                self.inflight[key] = future
+                future.add_done_callback(lambda f: self.forget(key))
+            return future
+
+    def forget(self, key):
+        with self.lock:
+            self.inflight.pop(key, None)
+
+    def request(self, key, url, callback):
+        """Carica la miniatura e chiama `callback(immagine o None)` dal thread del worker"""
+        def done(future):
+            try:
+                image = future.result()
+            except Exception as e:
+                # Es. DecompressionBombError di PIL: senza risposta il popup aspetterebbe per sempre
+                print(f"⚠️ Miniatura non disponibile per {key}: {str(e)}")
+                image = None
+            callback(image)
+
+        self.submit(key, url).add_done_callback(done)
+
+
+_loader = None
+_loader_lock = threading.Lock()
+
+
+def get_thumbnail_loader():
+    """Restituisce il loader condiviso, creato alla prima chiamata"""
+    global _loader
+    with _loader_lock:
+        if _loader is None:
+            _loader = ThumbnailLoader()
+        return _loader
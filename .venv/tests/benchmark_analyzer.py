@@ -0,0 +1,135 @@
+import json
+import random
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from core.database_manager import PriceStore
+from core.price_analyzer import analyze_card_prices, analyze_columns, np
+
+SAMPLE_FILE = ROOT_DIR / "data" / "prices" / "250098_raw.json"
+SAMPLE_BLUEPRINT = "250098"
+LINGUE = ["en", "jp"]
+# Senza NumPy analyze_columns usa il passaggio singolo in Python: le misure lo dicono esplicitamente
+COLONNE = "NumPy" if np is not None else "Python (NumPy non installato)"
+
+
+def analyze_card_prices_originale(prices_data, blueprint_id, selected_languages, only_zero=False):
+    """Versione precedente dell'analisi, tenuta come riferimento per risultati e tempi"""
+    if not prices_data or str(blueprint_id) not in prices_data:
+        return []
+    lang_prices = {}
+    lang_products = {}
+    for product in prices_data[str(blueprint_id)]:
+        if product['properties_hash'].get('condition', '') != 'Near Mint':
+            continue
+        if only_zero and not product['user']['can_sell_via_hub']:
+            continue
+        lang = product['properties_hash'].get('onepiece_language', '').lower()
+        if lang not in [l.lower() for l in selected_languages]:
+            continue
+        price = product['price_cents'] / 100
+        if not product['user']['can_sell_via_hub']:
+            price += 3
+        if lang not in lang_prices:
+            lang_prices[lang] = []
+            lang_products[lang] = []
+        lang_prices[lang].append(price)
+        lang_products[lang].append(product)
+    results = []
+    for lang, prices in lang_prices.items():
+        if len(prices) >= 2:
+            sorted_indices = sorted(range(len(prices)), key=lambda i: prices[i])
+            price1 = prices[sorted_indices[0]]
+            price2 = prices[sorted_indices[1]]
+            diff_abs = price2 - price1
+            diff_pct = (diff_abs / price1) * 100 if price1 != 0 else 0
+            results.append({
+                'language': lang,
+                'price1': round(price1, 2),
+                'price2': round(price2, 2),
+                'diff_abs': round(diff_abs, 2),
+                'diff_pct': round(diff_pct, 2),
+                'url': f"https://www.cardtrader.com/cards/{blueprint_id}",
+                'product_id': lang_products[lang][sorted_indices[0]]['id']
+            })
+    return results
+
+
+def genera_listini(num_blueprint, offerte_per_blueprint, seed=42):
+    """Moltiplica le offerte di esempio con prezzi, lingue e hub casuali"""
+    with open(SAMPLE_FILE, "r", encoding="utf-8") as f:
+        sample = json.load(f)[SAMPLE_BLUEPRINT]
+    rng = random.Random(seed)
+    lingue = ["en", "jp", "fr", "kr", "zh-CN"]
+    listini = {}
+    product_id = 1
+    for bp_id in range(400000, 400000 + num_blueprint):
+        offerte = []
+        for _ in range(offerte_per_blueprint):
+            base = rng.choice(sample)
+            offerte.append({
+                **base,
+                'id': product_id,
+                'blueprint_id': bp_id,
+                'price_cents': rng.randint(50, 20000),
+                'properties_hash': {**base['properties_hash'], 'onepiece_language': rng.choice(lingue)},
+                'user': {**base['user'], 'can_sell_via_hub': rng.random() < 0.5}
+            })
+            product_id += 1
+        listini[str(bp_id)] = offerte
+    return listini
+
+
+def verifica(listini, store):
+    """Controlla che le nuove analisi diano gli stessi risultati della versione precedente"""
+    chiavi = ['language', 'price1', 'price2', 'diff_abs', 'diff_pct', 'url', 'product_id']
+    dalla_cache = analyze_columns(*store.load_columns(listini, LINGUE), LINGUE, rank_depth=3)
+    for bp_id in listini:
+        attesi = analyze_card_prices_originale(listini, bp_id, LINGUE)
+        singoli = analyze_card_prices(listini, bp_id, LINGUE)
+        assert [{k: r[k] for k in chiavi} for r in singoli] == attesi, bp_id
+        # L'archivio conserva solo le offerte più economiche: confronto con l'analisi dei dati salvati
+        salvati = analyze_card_prices(store.load_prices(bp_id), bp_id, LINGUE, rank_depth=3)
+        colonne = dalla_cache.get(int(bp_id), [])
+        assert sorted(r['language'] for r in colonne) == sorted(r['language'] for r in salvati), bp_id
+        for r in colonne:
+            atteso = next(s for s in salvati if s['language'] == r['language'])
+            assert r['prices'] == atteso['prices'] and r['gaps'] == atteso['gaps'], bp_id
+
+
+def misura(nome, funzione, ripetizioni, num_blueprint):
+    elapsed = min(timeit.repeat(funzione, number=1, repeat=ripetizioni))
+    print(f"• {nome}: {elapsed * 1000:.1f} ms → {num_blueprint / elapsed:,.0f} blueprint/s")
+
+
+def carica_archivio(listini, db_file):
+    """Salva i listini in un archivio temporaneo come farebbe una scansione"""
+    store = PriceStore(db_file, batch_size=len(listini))
+    for bp_id in listini:
+        store.add(bp_id, listini)
+    store.flush()
+    return store
+
+
+if __name__ == "__main__":
+    tmp_dir = tempfile.TemporaryDirectory()
+    for num_blueprint, offerte in [(500, 25), (2000, 100)]:
+        listini = genera_listini(num_blueprint, offerte)
+        store = carica_archivio(listini, Path(tmp_dir.name) / f"{num_blueprint}.db")
+        verifica(listini, store)
+        colonne = store.load_columns(listini, LINGUE)
+        print(f"\n📊 {num_blueprint} blueprint × {offerte} offerte")
+        misura("Analisi originale", lambda: [analyze_card_prices_originale(listini, bp, LINGUE) for bp in listini], 3, num_blueprint)
+        misura("Analisi a passaggio singolo", lambda: [analyze_card_prices(listini, bp, LINGUE) for bp in listini], 3, num_blueprint)
+        misura("Analisi a passaggio singolo (3 posizioni)", lambda: [analyze_card_prices(listini, bp, LINGUE, rank_depth=3) for bp in listini], 3, num_blueprint)
+        misura("Cache: ricostruzione offerte + passaggio singolo",
+               lambda: [analyze_card_prices(store.load_prices(bp), bp, LINGUE, rank_depth=3) for bp in listini], 3, num_blueprint)
+        misura(f"Cache: colonne SQL + analisi a colonne {COLONNE}", lambda: analyze_columns(*store.load_columns(listini, LINGUE), LINGUE, rank_depth=3), 3, num_blueprint)
+        misura(f"Cache: solo analisi a colonne {COLONNE} su colonne già caricate", lambda: analyze_columns(*colonne, LINGUE, rank_depth=3), 3, num_blueprint)
+        store.close()
+    tmp_dir.cleanup()
@@ -0,0 +1,73 @@
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from core.api_client import CardTraderClient
+from core.database_manager import PriceStore
+from core.onepiece_search_logic import analyze_card_prices, iter_card_analyses
+from tests.fake_marketplace import load_sample_products, start_server
+
+LATENZA_SERVER = 0.08  # Latenza simulata di CardTrader per risposta
+NUM_CARTE = 40
+
+
+def start_benchmark_server():
+    products = load_sample_products()
+    return start_server(lambda bp_id: products, range(300000, 300000 + NUM_CARTE), LATENZA_SERVER)
+
+
+def run_sequential(base_url, blueprint_ids):
+    """Replica il vecchio ciclo: una requests.get nuova per carta seguita da sleep(0.4)"""
+    for blueprint_id in blueprint_ids:
+        response = requests.get(
+            f"{base_url}/marketplace/products",
+            headers={'Authorization': 'Bearer benchmark'},
+            params={'blueprint_id': blueprint_id, 'per_page': 100, 'sort_by': 'price_asc'},
+            timeout=15
+        )
+        analyze_card_prices(response.json(), blueprint_id, ["en", "jp"])
+        time.sleep(0.4)
+
+
+def run_engine(base_url, blueprint_ids, rate, bulk_min_cards):
+    """Scansione con il nuovo motore su carte sintetiche, senza toccare i file blueprint reali"""
+    client = CardTraderClient("benchmark", base_url=base_url, rate=rate, burst=rate)
+    cards = [{"id": bp_id, "name": f"Carta {bp_id}", "rarity": "Rare"} for bp_id in blueprint_ids]
+    # Archivio vuoto a ogni esecuzione, così nessuna carta arriva dalla cache
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = PriceStore(Path(tmp_dir) / "snapshots.db")
+        try:
+            for _ in iter_card_analyses(
+                {"benchmark": cards}, ["en", "jp"], client=client, bulk_min_cards=bulk_min_cards, store=store
+            ):
+                pass
+        finally:
+            store.close()
+            client.close()
+
+
+def misura(nome, funzione, *args):
+    start = time.perf_counter()
+    funzione(*args)
+    elapsed = time.perf_counter() - start
+    print(f"• {nome}: {NUM_CARTE} carte in {elapsed:.2f}s → {NUM_CARTE / elapsed:.1f} carte/s")
+
+
+if __name__ == "__main__":
+    server, base_url = start_benchmark_server()
+    blueprint_ids = list(range(300000, 300000 + NUM_CARTE))
+    print(f"📊 Benchmark scansione prezzi (latenza simulata {LATENZA_SERVER * 1000:.0f} ms)")
+    try:
+        misura("Ciclo sequenziale", run_sequential, base_url, blueprint_ids)
+        per_carta = len(blueprint_ids) + 1
+        misura("Motore parallelo (10 req/s, limite CardTrader)", run_engine, base_url, blueprint_ids, 10, per_carta)
+        misura("Motore parallelo (senza limite)", run_engine, base_url, blueprint_ids, 1000, per_carta)
+        misura("Motore per espansione (1 richiesta)", run_engine, base_url, blueprint_ids, 10, 1)
+    finally:
+        server.shutdown()
@@ -0,0 +1,123 @@
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_FILE = ROOT_DIR / "data" / "prices" / "250098_raw.json"
+SAMPLE_BLUEPRINT = "250098"
+BLUEPRINTS_DIR = ROOT_DIR / "data" / "onepiece" / "blueprints"
+
+
+def load_sample_products():
+    with open(SAMPLE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)[SAMPLE_BLUEPRINT]
+
+
+def load_blueprints(expansion_id):
+    blueprint_file = BLUEPRINTS_DIR / f"{expansion_id}.json"
+    if not blueprint_file.exists():
+        return []
+    with open(blueprint_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def blueprints_of_expansion(expansion_id):
+    return [card["id"] for card in load_blueprints(expansion_id)]
+
+
+def export_from_blueprints(expansion_id):
+    """Ricostruisce l'export CardTrader di un'espansione a partire dal file blueprint locale"""
+    return [
+        {
+            "id": card["id"],
+            "name": card["name"],
+            "category_id": 192,
+            "fixed_properties": {"onepiece_rarity": card["rarity"], "collector_number": card["collector_number"]},
+            "image": {"url": card["image_url"][len("https://cardtrader.com"):]} if card.get("image_url") else None,
+            "card_market_ids": card.get("card_market_ids", [])
+        }
+        for card in load_blueprints(expansion_id)
+    ]
+
+
+class FakeMarketplaceHandler(BaseHTTPRequestHandler):
+    """Risponde a /marketplace/products con le offerte restituite da `listings(blueprint_id)`
+    e a /blueprints/export con `exports(expansion_id)`; `expansion_blueprints` è la lista
+    dei blueprint restituiti per expansion_id, oppure una funzione dell'espansione.
+
+    Conta le richieste ricevute per ogni blueprint, così i test possono verificare
+    quanto spesso è stata interrogata ogni carta.
+    """
+    listings = None
+    exports = None
+    expansion_blueprints = []
+    latency = 0.0
+    hits = {}
+    lock = threading.Lock()
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.endswith("/blueprints/export"):
+            self.send_json(self.exports(query["expansion_id"][0]))
+            return
+        if "expansion_id" in query:
+            blueprint_ids = self.expansion_blueprints
+            if callable(blueprint_ids):
+                blueprint_ids = blueprint_ids(query["expansion_id"][0])
+            blueprint_ids = [str(bp_id) for bp_id in blueprint_ids]
+        else:
+            blueprint_ids = query.get("blueprint_id", [SAMPLE_BLUEPRINT])
+        with self.lock:
+            for bp_id in blueprint_ids:
+                self.hits[bp_id] = self.hits.get(bp_id, 0) + 1
+        self.send_json({bp_id: self.listings(bp_id) for bp_id in blueprint_ids})
+
+    def send_json(self, data):
+        body = json.dumps(data).encode("utf-8")
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(listings, expansion_blueprints=(), latency=0.0, port=0, exports=export_from_blueprints):
+    """Avvia il server in un thread; ritorna (server, base_url). `listings(blueprint_id)` → lista di offerte"""
+    handler = type("Handler", (FakeMarketplaceHandler,), {
+        "listings": staticmethod(listings),
+        "exports": staticmethod(exports),
+        "expansion_blueprints": staticmethod(expansion_blueprints) if callable(expansion_blueprints) else list(expansion_blueprints),
+        "latency": latency,
+        "hits": {},
+        "lock": threading.Lock()
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# Server con le offerte di esempio su ogni blueprint, per provare a mano bot e monitor:
+#   python tests/fake_marketplace.py 8765
+#   python -m core.monitor --base-url http://127.0.0.1:8765 --token prova
+if __name__ == "__main__":
+    products = load_sample_products()
+    server, base_url = start_server(
+        lambda bp_id: products, blueprints_of_expansion, latency=0.08,
+        port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    )
+    print(f"🛒 Marketplace finto in ascolto su {base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
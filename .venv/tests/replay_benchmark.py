@@ -0,0 +1,165 @@
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import data.onepiece.expansion_blueprint_generator as generator
+from core.api_client import API_BASE_URL, CardTraderClient
+from core.database_manager import PriceStore
+from core.metrics import MetricsReporter, get_metrics, profiled
+from core.monitor import load_selection
+from core.onepiece_search_logic import BULK_MIN_CARDS, search_opportunities_popup
+from core.replay import Cassette, RecordingAdapter, ReplayAdapter, mount
+from data.onepiece.state_manager import get_token
+
+REPLAY_DIR = ROOT_DIR / "data" / "replay"
+SCENARIO_FILE = "scenario.json"
+POOL_SIZE = 8
+
+# Registra una volta le risposte reali, poi riproduce la stessa esecuzione offline alla massima velocità:
+#   python tests/replay_benchmark.py record search --expansions op-01 op-02
+#   python tests/replay_benchmark.py replay search --repeat 5 --profile
+#   python tests/replay_benchmark.py record update
+#   python tests/replay_benchmark.py replay update --memory
+
+
+def run_search(client, scenario):
+    """Ricerca completa con archivio prezzi vuoto, così ogni carta passa dall'API"""
+    trovate = []
+
+    def on_carta(card_info, analizzate):
+        if not card_info.get("update_only"):
+            trovate.append(card_info)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = PriceStore(Path(tmp_dir) / "snapshots.db")
+        try:
+            search_opportunities_popup(
+                scenario["expansions"], scenario["languages"], scenario["rarities"],
+                scenario["min_price"], scenario["max_price"], scenario["min_diff"], scenario["only_zero"],
+                on_carta, client=client, bulk_min_cards=scenario["bulk_min_cards"], store=store
+            )
+        finally:
+            store.close()
+    return f"{len(trovate)} opportunità"
+
+
+def run_update(client, scenario):
+    """Aggiornamento carte su una copia dei blueprint, senza hash precedenti: export letti e confrontati tutti"""
+    originals = generator.BLUEPRINTS_DIR, generator.HASHES_FILE
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generator.BLUEPRINTS_DIR = Path(tmp_dir) / "blueprints"
+        generator.HASHES_FILE = Path(tmp_dir) / "blueprint_hashes.json"
+        shutil.copytree(originals[0], generator.BLUEPRINTS_DIR)
+        try:
+            report = generator.check_and_update_cards(scenario["expansion_code"], client=client)
+        finally:
+            generator.BLUEPRINTS_DIR, generator.HASHES_FILE = originals
+    return f"{report['updated_expansions']}/{report['total_expansions']} espansioni aggiornate"
+
+
+SCENARI = {"search": run_search, "update": run_update}
+
+
+def build_scenario(args):
+    if args.mode == "update":
+        return {"mode": "update", "expansion_code": args.expansion}
+    expansions, languages, rarities = load_selection(args.expansions, args.languages, args.rarities)
+    return {
+        "mode": "search",
+        "expansions": expansions,
+        "languages": languages,
+        "rarities": rarities,
+        "min_price": args.min_price,
+        "max_price": args.max_price,
+        "min_diff": args.min_diff,
+        "only_zero": args.only_zero,
+        "bulk_min_cards": args.bulk_min_cards
+    }
+
+
+def record(args, cassette_dir):
+    scenario = build_scenario(args)
+    cassette = Cassette(cassette_dir)
+    client = CardTraderClient(args.token or get_token(), base_url=args.base_url)
+    mount(client, RecordingAdapter(cassette, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE))
+    try:
+        result = SCENARI[args.mode](client, scenario)
+    finally:
+        client.close()
+        cassette.write_index()
+    with open(cassette_dir / SCENARIO_FILE, "w", encoding="utf-8") as f:
+        json.dump({**scenario, "base_url": args.base_url}, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Registrate {len(cassette)} risposte in {cassette_dir} ({result})")
+
+
+def replay(args, cassette_dir):
+    with open(cassette_dir / SCENARIO_FILE, "r", encoding="utf-8") as f:
+        scenario = json.load(f)
+    cassette = Cassette(cassette_dir)
+
+    tempi = []
+    for i in range(args.repeat):
+        # Stesso URL della registrazione (le chiavi contengono il percorso) e nessun limite: le risposte arrivano dal disco
+        client = CardTraderClient("replay", base_url=scenario["base_url"], rate=1e9, burst=1e9)
+        adapter = mount(client, ReplayAdapter(cassette, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE))
+        profilo = profiled(args.profile if args.profile is not True else None, args.memory) \
+            if (args.profile or args.memory) and i == 0 else nullcontext()
+        start = time.perf_counter()
+        try:
+            with profilo:
+                result = SCENARI[scenario["mode"]](client, scenario)
+        finally:
+            client.close()
+        tempi.append(time.perf_counter() - start)
+        print(f"⏱️ Esecuzione {i + 1}: {tempi[-1]:.3f}s ({result})")
+        if adapter.misses:
+            print(f"⚠️ {len(adapter.misses)} richieste non registrate (es. {adapter.misses[0]}): ripetere la registrazione")
+
+    print(f"\n📊 Riproduzione {scenario['mode']}: migliore {min(tempi):.3f}s, mediana {statistics.median(tempi):.3f}s "
+          f"su {len(tempi)} esecuzioni, {len(cassette)} risposte registrate")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Registra e riproduce offline ricerca e aggiornamento carte")
+    parser.add_argument("action", choices=["record", "replay"])
+    parser.add_argument("mode", choices=sorted(SCENARI))
+    parser.add_argument("--cassette", type=Path, help="Cartella delle risposte (default: data/replay/<mode>)")
+    parser.add_argument("--base-url", default=API_BASE_URL)
+    parser.add_argument("--token", help="Token JWT (default: data/config.json)")
+    parser.add_argument("--expansions", nargs="+", metavar="CODICE", help="Ricerca: codici espansione (default: selezione salvata)")
+    parser.add_argument("--languages", nargs="+")
+    parser.add_argument("--rarities", nargs="+")
+    parser.add_argument("--min-price", type=float, default=1.0)
+    parser.add_argument("--max-price", type=float, default=1000.0)
+    parser.add_argument("--min-diff", type=float, default=1.0)
+    parser.add_argument("--only-zero", action="store_true")
+    parser.add_argument("--bulk-min-cards", type=int, default=BULK_MIN_CARDS)
+    parser.add_argument("--expansion", help="Aggiornamento: una sola espansione (default: tutte)")
+    parser.add_argument("--repeat", type=int, default=3, help="Riproduzioni da eseguire")
+    parser.add_argument("--profile", nargs="?", const=True, metavar="FILE", help="cProfile sulla prima riproduzione")
+    parser.add_argument("--memory", action="store_true", help="tracemalloc sulla prima riproduzione")
+    parser.add_argument("--log-interval", type=float, help="Secondi tra due righe JSON di metriche su stderr")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    cassette_dir = args.cassette or REPLAY_DIR / args.mode
+    reporter = MetricsReporter(get_metrics(), args.log_interval).start() if args.log_interval else None
+    try:
+        if args.action == "record":
+            record(args, cassette_dir)
+        else:
+            replay(args, cassette_dir)
+    finally:
+        if reporter:
+            reporter.stop()
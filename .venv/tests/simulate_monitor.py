@@ -0,0 +1,127 @@
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from core.api_client import CardTraderClient
+from core.metrics import get_metrics
+from core.monitor import Monitor
+from data.onepiece.catalog_index import get_catalog
+from tests.fake_marketplace import blueprints_of_expansion, load_sample_products, start_server
+
+LINGUE = ["en", "jp"]
+DURATA = 12  # Secondi di monitoraggio per ogni simulazione
+INTERVALLO_BASE = 2  # Secondi: gli intervalli reali (10 minuti) ridotti in scala
+ESPANSIONE_BLOCCO = "op-01"  # Espansione più grande di un lotto del monitor, scaricata in blocco
+
+
+class RaccoltaEventi:
+    """Sink che tiene in memoria gli eventi emessi dal monitor"""
+
+    def __init__(self):
+        self.eventi = []
+
+    def emit(self, event):
+        self.eventi.append(event)
+
+    def close(self):
+        pass
+
+
+def crea_scenari():
+    """Un blueprint per tipo di listino, con comportamenti diversi a ogni richiesta"""
+    campione = load_sample_products()
+    inglesi = [p for p in campione if p['properties_hash'].get('onepiece_language') == 'en']
+
+    def scala(prodotti, fattore):
+        return [{**p, 'price_cents': int(p['price_cents'] * fattore)} for p in prodotti]
+
+    return {
+        "500001": ("morta", lambda: []),
+        "500002": ("tranquilla", lambda: inglesi),
+        "500003": ("occasione", lambda: campione),
+        "500004": ("volatile", lambda: scala(inglesi, random.uniform(0.6, 1.4))),
+        "500005": ("costosa", lambda: scala(inglesi, 3)),
+    }
+
+
+def simula(budget):
+    scenari = crea_scenari()
+    server, base_url = start_server(lambda bp_id: scenari[bp_id][1]())
+    rate = budget / 60
+    client = CardTraderClient("simulazione", base_url=base_url, rate=rate, burst=max(1.0, rate))
+    cards = [{"id": int(bp_id), "name": nome, "rarity": "Rare"} for bp_id, (nome, _) in scenari.items()]
+    sink = RaccoltaEventi()
+    monitor = Monitor(
+        {"simulazione": cards}, LINGUE, 1, 1000, 1, False, sink, client,
+        budget=budget, bulk_min_cards=len(cards) + 1,
+        base_interval=INTERVALLO_BASE, min_interval=INTERVALLO_BASE / 8, max_interval=INTERVALLO_BASE * 6
+    )
+    start = time.perf_counter()
+    try:
+        monitor.run(DURATA)
+    finally:
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        client.close()
+    richieste = {scenari[bp_id][0]: n for bp_id, n in server.RequestHandlerClass.hits.items()}
+    return richieste, sink.eventi, elapsed
+
+
+def simula_blocco():
+    """Un solo giro su un'espansione con tutte le carte scadute: deve bastare un download dell'espansione"""
+    catalog = get_catalog()
+    exp_id = catalog.expansion_id(ESPANSIONE_BLOCCO)
+    cards = catalog.cards(exp_id)
+    campione = load_sample_products()
+    server, base_url = start_server(lambda bp_id: campione, blueprints_of_expansion)
+    client = CardTraderClient("simulazione", base_url=base_url, rate=100, burst=100)
+    monitor = Monitor(
+        {exp_id: cards}, LINGUE, 1, 1000, 1, False, RaccoltaEventi(), client,
+        budget=600, base_interval=60, min_interval=30, max_interval=360
+    )
+    metrics = get_metrics()
+    start = metrics.snapshot()
+    try:
+        monitor.run(1)
+    finally:
+        server.shutdown()
+        client.close()
+    latency = metrics.report(since=start)["latency"]
+    return (
+        len(cards),
+        latency.get("/marketplace/products?expansion_id", {}).get("count", 0),
+        latency.get("/marketplace/products?blueprint_id", {}).get("count", 0),
+        monitor.scanned,
+        monitor.scheduler.demand * 60
+    )
+
+
+if __name__ == "__main__":
+    print(f"📡 Simulazione monitor: {DURATA}s, intervallo base {INTERVALLO_BASE}s")
+
+    richieste, eventi, elapsed = simula(budget=600)
+    print(f"\n• Budget ampio (600 richieste/min): {sum(richieste.values())} richieste in {elapsed:.1f}s")
+    for nome in ["morta", "tranquilla", "occasione", "volatile", "costosa"]:
+        print(f"  - {nome}: {richieste.get(nome, 0)} scansioni")
+    print(f"  - opportunità segnalate: {[(e['name'], e['language']) for e in eventi]}")
+    assert richieste["morta"] < richieste["tranquilla"] < min(richieste["occasione"], richieste["costosa"])
+    assert richieste["tranquilla"] < richieste["volatile"]
+    # L'occasione resta identica a ogni scansione: va segnalata una volta sola
+    assert [(e['name'], e['language']) for e in eventi] == [("occasione", "jp")]
+
+    richieste, eventi, elapsed = simula(budget=30)
+    totale = sum(richieste.values())
+    print(f"\n• Budget ridotto (30 richieste/min): {totale} richieste in {elapsed:.1f}s")
+    assert totale <= 30 / 60 * elapsed + 2
+
+    carte, blocchi, singole, scansionate, domanda = simula_blocco()
+    print(f"\n• Espansione {ESPANSIONE_BLOCCO} ({carte} carte scadute): {blocchi} download dell'espansione, "
+          f"{singole} richieste per carta, {scansionate} carte aggiornate, {domanda:.1f} richieste/min previste")
+    assert (blocchi, singole, scansionate) == (1, 0, carte)
+    # L'espansione costa una richiesta per giro, non una per carta
+    assert domanda <= 60 / 30
+    print("\n✅ Priorità e budget rispettati")
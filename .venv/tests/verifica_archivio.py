@@ -0,0 +1,111 @@
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from core.api_client import CardTraderClient
+from core.database_manager import HISTORY_DAYS, PriceStore
+from core.onepiece_search_logic import iter_card_analyses
+from tests.fake_marketplace import load_sample_products, start_server
+
+LINGUE = ["en", "jp"]
+NUM_CARTE = 6
+TTL = 60  # Secondi di validità degli snapshot nell'archivio di prova
+
+
+def scansiona(store, client, cards):
+    """Una ricerca completa; ritorna le carte analizzate con almeno un risultato"""
+    return {
+        card['id'] for card, analyses in iter_card_analyses(
+            {"verifica": cards}, LINGUE, client=client, bulk_min_cards=len(cards) + 1, store=store
+        ) if analyses
+    }
+
+
+def richieste(server):
+    return sum(server.RequestHandlerClass.hits.values())
+
+
+def verifica_ttl(store, blueprint_ids):
+    adesso = time.time()
+    assert store.fresh_blueprints(blueprint_ids, now=adesso) == set(blueprint_ids)
+    assert store.fresh_blueprints(blueprint_ids, now=adesso + TTL + 1) == set()
+    print(f"• TTL: {len(blueprint_ids)} snapshot validi ora, nessuno dopo {TTL}s")
+
+
+def verifica_delta(store, client, server, cards):
+    prima = richieste(server)
+    trovate = scansiona(store, client, cards)
+    assert richieste(server) == prima, "la seconda ricerca deve arrivare tutta dall'archivio"
+
+    # Due snapshot scaduti: solo quelle carte tornano al marketplace
+    scadute = [card['id'] for card in cards[:2]]
+    conn = store.connection()
+    with conn:
+        conn.executemany("UPDATE blueprints SET expires_at = 0 WHERE blueprint_id = ?", [(bp,) for bp in scadute])
+    server.RequestHandlerClass.hits.clear()
+    assert scansiona(store, client, cards) == trovate
+    assert server.RequestHandlerClass.hits == {str(bp): 1 for bp in scadute}, server.RequestHandlerClass.hits
+    print(f"• Riscansione delta: 0 richieste con archivio valido, {len(scadute)} per {len(scadute)} snapshot scaduti")
+
+
+def verifica_pulizia(store, blueprint_id):
+    oggi = date.today()
+    vecchio = (oggi - timedelta(days=HISTORY_DAYS + 1)).strftime("%Y-%m-%d")
+    recente = (oggi - timedelta(days=HISTORY_DAYS - 1)).strftime("%Y-%m-%d")
+    conn = store.connection()
+
+    def inserisci():
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO history VALUES (?, 'en', ?, 100)",
+                [(blueprint_id, vecchio), (blueprint_id, recente)]
+            )
+
+    def giorni():
+        return [row[0] for row in conn.execute(
+            "SELECT day FROM history WHERE blueprint_id = ? AND day IN (?, ?) ORDER BY day",
+            (blueprint_id, vecchio, recente)
+        )]
+
+    # Le ricerche precedenti hanno già pulito oggi: un altro flush non ripete la DELETE
+    inserisci()
+    store.flush()
+    assert giorni() == [vecchio, recente], giorni()
+
+    # Il giorno dopo la pulizia riparte ed elimina solo le righe oltre il limite
+    store.prune_history(oggi + timedelta(days=1))
+    assert giorni() == [recente], giorni()
+
+    piano = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN DELETE FROM history WHERE day < ?", (vecchio,)
+    ))
+    assert "history_day" in piano, piano
+    print(f"• Storico: righe oltre {HISTORY_DAYS} giorni eliminate una volta al giorno, tramite l'indice history_day")
+
+
+if __name__ == "__main__":
+    products = load_sample_products()
+    blueprint_ids = list(range(600000, 600000 + NUM_CARTE))
+    cards = [{"id": bp_id, "name": f"Carta {bp_id}", "rarity": "Rare"} for bp_id in blueprint_ids]
+    server, base_url = start_server(lambda bp_id: products)
+    client = CardTraderClient("verifica", base_url=base_url, rate=1000, burst=1000)
+
+    print("🗄️ Verifica archivio prezzi")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = PriceStore(Path(tmp_dir) / "snapshots.db", ttl=TTL)
+        try:
+            assert len(scansiona(store, client, cards)) == NUM_CARTE
+            assert richieste(server) == NUM_CARTE
+            verifica_ttl(store, blueprint_ids)
+            verifica_delta(store, client, server, cards)
+            verifica_pulizia(store, blueprint_ids[0])
+        finally:
+            store.close()
+            client.close()
+            server.shutdown()
+    print("\n✅ Archivio prezzi verificato")
@@ -0,0 +1,84 @@
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import core.api_client as api_client
+import data.onepiece.state_manager as state_manager
+from core.database_manager import PriceStore
+from core.onepiece_search_logic import search_opportunities_popup
+from data.onepiece.catalog_index import get_catalog
+from tests.fake_marketplace import blueprints_of_expansion, load_sample_products, start_server
+
+TOKEN = "token-di-verifica"
+
+# GUI, ricerca e aggiornamento carte non passano un client: usano get_client(), che legge
+# il token da data/config.json. Qui lo si verifica con un config temporaneo e il marketplace finto.
+
+
+def espansione_piccola():
+    """L'espansione locale più piccola con almeno una carta, per una ricerca veloce"""
+    catalog = get_catalog()
+    exp_id = min((exp_id for exp_id in catalog.by_expansion if catalog.cards(exp_id)),
+                 key=lambda exp_id: len(catalog.cards(exp_id)))
+    return exp_id, catalog.cards(exp_id)
+
+
+def verifica_config_mancante(tmp_dir):
+    state_manager.CONFIG_FILE = Path(tmp_dir) / "mancante.json"
+    try:
+        api_client.get_client()
+    except FileNotFoundError as e:
+        print(f"• Config mancante: {str(e)}")
+    else:
+        raise AssertionError("get_client() deve segnalare il config.json mancante")
+
+
+def verifica_ricerca(tmp_dir, base_url, server):
+    config_file = Path(tmp_dir) / "config.json"
+    config_file.write_text(json.dumps({"jwt_token": TOKEN}), encoding="utf-8")
+    state_manager.CONFIG_FILE = config_file
+
+    client = api_client.get_client()
+    assert client.session.headers["Authorization"] == f"Bearer {TOKEN}"
+    # Stesso client condiviso che userà la ricerca, indirizzato al marketplace finto
+    client.base_url = base_url
+
+    exp_id, cards = espansione_piccola()
+    rarities = sorted({card.get('rarity', '') for card in cards})
+    progresso = []
+
+    def on_carta(card_info, analizzate):
+        progresso.append(analizzate)
+
+    store = PriceStore(Path(tmp_dir) / "snapshots.db")
+    try:
+        search_opportunities_popup([exp_id], ["en", "jp"], rarities, 0, 100000, 0, False, on_carta, store=store)
+    finally:
+        store.close()
+
+    richieste = sum(server.RequestHandlerClass.hits.values())
+    assert max(progresso, default=0) == len(cards), (progresso, len(cards))
+    assert richieste >= 1
+    print(f"• Ricerca senza client esplicito: {len(cards)} carte dell'espansione {exp_id}, {richieste} richieste")
+
+
+if __name__ == "__main__":
+    products = load_sample_products()
+    server, base_url = start_server(lambda bp_id: products, blueprints_of_expansion)
+    original_config = state_manager.CONFIG_FILE
+
+    print("🔑 Verifica client predefinito")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            verifica_config_mancante(tmp_dir)
+            verifica_ricerca(tmp_dir, base_url, server)
+        finally:
+            state_manager.CONFIG_FILE = original_config
+            if api_client._default_client is not None:
+                api_client._default_client.close()
+            server.shutdown()
+    print("\n✅ Client predefinito verificato")